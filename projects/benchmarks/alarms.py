@@ -0,0 +1,56 @@
+# Step cost of instances waiting on timers: a countdown in event_step
+# against alarm_set, which only touches the alarms that go off.
+# Run from the projects folder: python benchmarks/alarms.py
+import os, sys
+from timeit import default_timer as timer
+
+os.environ.setdefault('ODIN_HEADLESS', '1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from odin import *
+
+FRAMES = 120
+fired = [0]
+
+class obj_counter(CompactObject):
+    __slots__ = ('countdown',)
+
+    def event_create(self):
+        self.countdown = 60 + self.id % 60
+
+    def event_step(self):
+        self.countdown -= 1
+        if self.countdown == 0:
+            fired[0] += 1
+            self.countdown = 60
+
+class obj_alarm(CompactObject):
+    # Not stepped at all, only its alarms run.
+    idle = True
+
+    def event_create(self):
+        alarm_set(self, 0, 60 + self.id % 60)
+
+    def event_alarm0(self):
+        fired[0] += 1
+        alarm_set(self, 0, 60)
+
+def room_of(obj, count):
+    class room_timers(Room):
+        background_color = (0, 0, 0)
+
+        def create_event(self):
+            for i in range(count):
+                instance_create(obj, (i % 100) * 8, (i // 100) * 8)
+    return room_timers
+
+def frame_time(obj, count):
+    fired[0] = 0
+    results = run_frames(room_of(obj, count), FRAMES, draw=False)
+    step = sum(times['step'] for times in results)
+    return step / FRAMES * 1000.0, fired[0]
+
+if __name__ == '__main__':
+    print("%10s %18s %18s" % ("instances", "countdown ms", "alarms ms"))
+    for count in (1000, 5000, 20000):
+        print("%10d %11.2f (%4d) %11.2f (%4d)" % ((count,) + frame_time(obj_counter, count)
+                                                   + frame_time(obj_alarm, count)))
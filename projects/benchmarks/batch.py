@@ -0,0 +1,52 @@
+# Frame cost (step and draw) of moving instances: Object instances stepped
+# and drawn one Python call at a time versus BatchObject instances moved
+# by batch_step() and drawn from their columns.
+# Run from the projects folder: python benchmarks/batch.py
+import os, sys, random
+
+os.environ.setdefault('ODIN_HEADLESS', '1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from odin import *
+
+FRAMES = 30
+
+def block(color, size):
+    sprite = pygame.Surface((size, size))
+    sprite.fill(color)
+    return sprite.convert()
+
+class obj_particle(Object):
+    sprite_index = block((200, 200, 40), 8)
+
+    def event_step(self):
+        self.x += self.hspeed
+        self.y += self.vspeed
+
+class obj_particle_batch(BatchObject):
+    sprite_index = block((200, 200, 40), 8)
+
+class room_particles(Room):
+    background_color = (0, 0, 0)
+    obj = obj_particle
+    count = 1000
+
+    def create_event(self):
+        random.seed(0)
+        for i in range(self.count):
+            p = instance_create(self.obj, random.uniform(0, 640), random.uniform(0, 480))
+            p.hspeed = random.uniform(-1, 1)
+            p.vspeed = random.uniform(-1, 1)
+
+def frame_time(obj, count):
+    room_particles.obj = obj
+    room_particles.count = count
+    results = run_frames(room_particles, FRAMES)
+    step = sum(times['step'] + times['update'] for times in results) / FRAMES * 1000.0
+    draw = sum(times['draw'] for times in results) / FRAMES * 1000.0
+    return step, draw
+
+if __name__ == '__main__':
+    print("%10s %18s %18s" % ("instances", "object step/draw", "batch step/draw"))
+    for count in (1000, 10000, 50000):
+        print("%10d %8.2f %8.2f ms %8.2f %8.2f ms" % ((count,) + frame_time(obj_particle, count)
+                                                      + frame_time(obj_particle_batch, count)))
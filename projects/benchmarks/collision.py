@@ -0,0 +1,63 @@
+# Frame time of the step/update/collision loop as the wall count grows,
+# comparing the spatial hash against the old scan over objects_group.
+# Run from the projects folder: python benchmarks/collision.py
+import os, sys, random
+from timeit import default_timer as timer
+
+os.environ.setdefault('ODIN_HEADLESS', '1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from odin import *
+
+FRAMES = 60
+MOVERS = 20
+
+class obj_wall(Object):
+    pass
+
+class obj_mover(Object):
+    def event_step(self):
+        self.xprevious = self.x
+        self.yprevious = self.y
+        self.x += random.choice((-2, 2))
+        self.y += random.choice((-2, 2))
+
+class obj_mover_scan(obj_mover):
+    def event_collision(self, obj=obj_wall):
+        for other in objects_group:
+            if other.__class__ == obj:
+                if self.mask.colliderect(other.mask):
+                    self.x = self.xprevious
+                    self.y = self.yprevious
+
+class obj_mover_grid(obj_mover):
+    def event_collision(self, obj=obj_wall):
+        for other in collision_list(self.mask, obj, self):
+            self.x = self.xprevious
+            self.y = self.yprevious
+
+def build(count, mover):
+    del objects_group[:]
+    spatial_index.clear()
+    random.seed(0)
+    side = int(count ** 0.5) + 1
+    for i in range(count):
+        instance_create(obj_wall, (i % side) * 32, (i // side) * 32)
+    for i in range(MOVERS):
+        instance_create(mover, random.randint(0, side * 32), random.randint(0, side * 32))
+
+def frame_time(count, mover):
+    build(count, mover)
+    start = timer()
+    for frame in range(FRAMES):
+        for instance in objects_group:
+            instance.event_step()
+            instance.event_update()
+            instance.event_collision()
+    return (timer() - start) / FRAMES * 1000.0
+
+if __name__ == '__main__':
+    print("%8s %12s %12s" % ("walls", "scan ms", "grid ms"))
+    for count in (100, 500, 1000, 2000, 5000):
+        scan = frame_time(count, obj_mover_scan)
+        grid = frame_time(count, obj_mover_grid)
+        print("%8d %12.3f %12.3f" % (count, scan, grid))
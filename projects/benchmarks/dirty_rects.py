@@ -0,0 +1,60 @@
+# Frame time and CPU time of a mostly static room (many still instances,
+# one moving) drawn with full redraw + flip and with dirty rectangles.
+# With SDL's dummy video driver flip() is nearly free, run it on a real
+# display to see what the smaller display updates save.
+# Run from the projects folder: python benchmarks/dirty_rects.py
+import os, sys, random
+from timeit import default_timer as timer
+
+os.environ.setdefault('ODIN_HEADLESS', '1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from odin import *
+
+FRAMES = 300
+
+def solid(color):
+    sprite = pygame.Surface((32, 32))
+    sprite.fill(color)
+    return sprite.convert()
+
+class obj_block(Object):
+    sprite_index = solid((90, 90, 90))
+
+class obj_player(Object):
+    sprite_index = solid((200, 40, 40))
+
+    def event_step(self):
+        self.x = (self.x + 2) % 608
+
+class room_static(Room):
+    background_color = (150, 100, 150)
+
+    def create_event(self):
+        random.seed(0)
+        cells = random.sample(range(20 * 15), self.blocks)
+        for cell in cells:
+            instance_create(obj_block, (cell % 20) * 32, (cell // 20) * 32)
+        instance_create(obj_player, 0, 224)
+
+def run(blocks, dirty):
+    room_static.blocks = blocks
+    draw_set_dirty_rects(dirty)
+    change_room(room_static)
+    cpu = os.times()
+    start = timer()
+    for frame in range(FRAMES):
+        for instance in objects_group:
+            instance.event_step()
+            instance.event_update()
+        game_flip(game_draw())
+    wall = (timer() - start) / FRAMES * 1000.0
+    cpu_end = os.times()
+    cpu = (cpu_end[0] + cpu_end[1] - cpu[0] - cpu[1]) / FRAMES * 1000.0
+    return wall, cpu
+
+if __name__ == '__main__':
+    print("%8s %10s %10s %10s %10s" % ("blocks", "full ms", "full cpu", "dirty ms", "dirty cpu"))
+    for blocks in (50, 150, 280):
+        full = run(blocks, False)
+        dirty = run(blocks, True)
+        print("%8d %10.3f %10.3f %10.3f %10.3f" % ((blocks,) + full + dirty))
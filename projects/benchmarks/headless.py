@@ -0,0 +1,75 @@
+# Headless performance suite: the generated main.py plus synthetic stress
+# rooms, each run for a fixed number of frames with scripted input.
+# Run from the projects folder: python benchmarks/headless.py
+import os, sys, random, subprocess
+
+os.environ.setdefault('ODIN_HEADLESS', '1')
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, PROJECT_DIR)
+from odin import *
+
+FRAMES = 300
+
+def block(color, size=32):
+    sprite = pygame.Surface((size, size))
+    sprite.fill(color)
+    return sprite.convert()
+
+class obj_wall(Object):
+    sprite_index = block((90, 90, 90))
+
+class obj_runner(Object):
+    sprite_index = block((200, 40, 40), 16)
+
+    def event_create(self):
+        self.speed = 2
+
+    def event_step(self):
+        if keyboard_check(vk_right) and place_empty(self.x + 17, self.y, obj_wall):
+            self.x += self.speed
+        if keyboard_check(vk_left) and place_empty(self.x - 1, self.y, obj_wall):
+            self.x -= self.speed
+        if keyboard_check(vk_down) and place_empty(self.x, self.y + 17, obj_wall):
+            self.y += self.speed
+        if keyboard_check(vk_up) and place_empty(self.x, self.y - 1, obj_wall):
+            self.y -= self.speed
+
+    def event_collision(self, obj=obj_wall):
+        if rect_meeting(self.mask, obj, self):
+            self.x = self.xprevious
+            self.y = self.yprevious
+
+class room_stress(Room):
+    background_color = (0, 0, 0)
+    walls = 1000
+    runners = 200
+
+    def create_event(self):
+        random.seed(0)
+        for i in range(self.walls):
+            instance_create(obj_wall, random.randint(0, 19) * 32, random.randint(0, 14) * 32)
+        for i in range(self.runners):
+            instance_create(obj_runner, random.randint(0, 620), random.randint(0, 460))
+
+def wander(frames):
+    # Same pseudo random key presses on every run.
+    rng = random.Random(1)
+    directions = (vk_right, vk_left, vk_up, vk_down)
+    script = []
+    keys = ()
+    for frame in range(frames):
+        if frame % 30 == 0:
+            keys = rng.sample(directions, 2)
+        script.append(keys)
+    return script
+
+if __name__ == '__main__':
+    print("== main.py (%d frames)" % FRAMES)
+    env = dict(os.environ, ODIN_FRAMES=str(FRAMES))
+    sys.stdout.flush()
+    subprocess.call([sys.executable, "main.py"], cwd=PROJECT_DIR, env=env)
+    for walls, runners in ((200, 50), (1000, 200), (3000, 500)):
+        room_stress.walls = walls
+        room_stress.runners = runners
+        print("== stress room, %d walls, %d runners (%d frames)" % (walls, runners, FRAMES))
+        print(timings_report(run_frames(room_stress, FRAMES, wander(FRAMES))))
@@ -0,0 +1,67 @@
+# Peak memory of 100k instances with the old all-__dict__ layout, the
+# slotted Object and CompactObject, each measured in a fresh interpreter.
+# Run from the projects folder: python benchmarks/memory.py
+import os, sys, subprocess, resource
+from timeit import default_timer as timer
+
+os.environ.setdefault('ODIN_HEADLESS', '1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+COUNT = 100000
+
+def peak_kb():
+    # ru_maxrss is in bytes on OSX and in kilobytes elsewhere.
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return usage // 1024
+    return usage
+
+def measure(layout):
+    import pygame
+    from odin import Object, CompactObject
+
+    class obj_tile_dict(object):
+        # Layout of Object before the core fields moved to __slots__.
+        visible = True
+        def __init__(self, x, y):
+            self.x = x
+            self.y = y
+            self.mask = pygame.Rect(x, y, 32, 32)
+
+    class obj_tile(Object):
+        visible = True
+
+    class obj_tile_compact(CompactObject):
+        visible = True
+
+    cls = {"dict": obj_tile_dict, "object": obj_tile,
+           "compact": obj_tile_compact, "none": None}[layout]
+    before = peak_kb()
+    instances = []
+    start = timer()
+    if cls is not None:
+        for i in range(COUNT):
+            tile = cls(i % 640, i // 640)
+            tile.speed = 0
+            instances.append(tile)
+    created = timer() - start
+    start = timer()
+    for tile in instances:
+        tile.x = tile.x + tile.speed
+    access = timer() - start
+    print("%d %f %f" % (peak_kb() - before, created, access))
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        measure(sys.argv[1])
+        sys.exit()
+    results = {}
+    for layout in ("none", "dict", "object", "compact"):
+        out = subprocess.check_output([sys.executable, __file__, layout])
+        results[layout] = [float(v) for v in out.decode().split()[-3:]]
+    base = results["none"][0]
+    print("%d instances" % COUNT)
+    print("%10s %10s %12s %12s" % ("layout", "KiB", "create ms", "access ms"))
+    for layout in ("dict", "object", "compact"):
+        kb, created, access = results[layout]
+        print("%10s %10d %12.1f %12.1f" % (layout, kb - base, created * 1000, access * 1000))
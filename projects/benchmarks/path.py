@@ -0,0 +1,109 @@
+# Chasers finding their way to the player through a tile maze: one A*
+# search per chaser against one shared flow field. A* paths are first
+# checked against breadth first search distances.
+# Run from the projects folder: python benchmarks/path.py
+import os, sys, random
+from collections import deque
+
+os.environ.setdefault('ODIN_HEADLESS', '1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import odin
+from odin import *
+
+FRAMES = 120
+
+def block(color, size):
+    sprite = pygame.Surface((size, size))
+    sprite.fill(color)
+    return sprite.convert()
+
+def maze(columns, rows, seed=0):
+    rng = random.Random(seed)
+    level = []
+    for row in range(rows):
+        line = ""
+        for column in range(columns):
+            edge = row in (0, rows - 1) or column in (0, columns - 1)
+            line += "W" if edge or rng.random() < 0.25 else " "
+        level.append(line)
+    return level
+
+class obj_wall(Object):
+    sprite_index = block((90, 90, 90), 32)
+
+class obj_player(Object):
+    sprite_index = block((40, 40, 200), 16)
+
+class obj_chaser(Object):
+    sprite_index = block((200, 40, 40), 16)
+    shared = True
+
+    def event_step(self):
+        player = room_maze.player
+        if self.shared:
+            point = path_next(self, player)
+        else:
+            path = path_find(self, player)
+            point = path[1] if len(path) > 1 else None
+        if point is not None:
+            self.x += (point[0] > self.mask.centerx) - (point[0] < self.mask.centerx)
+            self.y += (point[1] > self.mask.centery) - (point[1] < self.mask.centery)
+
+class room_maze(Room):
+    background_color = (0, 0, 0)
+    chasers = 200
+    player = None
+
+    def create_event(self):
+        level = maze(40, 30)
+        self.tile_layer(level, {"W": obj_wall})
+        free = [(column * 32 + 8, row * 32 + 8) for row, line in enumerate(level)
+                for column, char in enumerate(line) if char == " "]
+        rng = random.Random(1)
+        room_maze.player = instance_create(obj_player, *free[0])
+        for i in range(self.chasers):
+            instance_create(obj_chaser, *rng.choice(free))
+        path_grid(obj_wall)
+
+def distances(nav, goal):
+    # Breadth first search over the free cells (straight moves).
+    found = {goal: 0}
+    queue = deque([goal])
+    while queue:
+        index = queue.popleft()
+        for neighbour, cost in nav.neighbours(index):
+            if neighbour not in found:
+                found[neighbour] = found[index] + 1
+                queue.append(neighbour)
+    return found
+
+def check():
+    change_room(room_maze)
+    nav = odin.path_nav()
+    rng = random.Random(2)
+    free = [index for index in range(nav.columns * nav.rows) if not nav.solid[index]]
+    for attempt in range(50):
+        goal = rng.choice(free)
+        reach = distances(nav, goal)
+        for start in rng.sample(free, 20):
+            path = nav.search(start, goal)
+            if start in reach:
+                assert len(path) == reach[start] + 1
+                assert path[0] == start and path[-1] == goal
+            else:
+                assert path == []
+            field = nav.flow(goal)
+            assert len(nav.follow(field, start, goal)) == len(path)
+
+def run(shared):
+    obj_chaser.shared = shared
+    results = run_frames(room_maze, FRAMES, draw=False)
+    step = sum(times['step'] for times in results) / FRAMES * 1000.0
+    return step, path_stats()
+
+if __name__ == '__main__':
+    check()
+    print("A* paths match breadth first search")
+    for shared in (False, True):
+        step, stats = run(shared)
+        print("%-12s %8.2f ms/step  %s" % ("flow field" if shared else "A* each", step, stats))
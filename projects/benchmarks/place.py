@@ -0,0 +1,74 @@
+# Checks place_empty/place_meeting/collision_rectangle against a brute
+# force scan over objects_group, then times them with 10k static walls.
+# Run from the projects folder: python benchmarks/place.py
+import os, sys, random
+from timeit import default_timer as timer
+
+os.environ.setdefault('ODIN_HEADLESS', '1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from odin import *
+
+WALLS = 10000
+QUERIES = 20000
+
+class obj_wall(Object):
+    pass
+
+class obj_coin(Object):
+    pass
+
+def oracle_place_meeting(x, y, obj=None):
+    for other in objects_group:
+        if obj is None or isinstance(other, obj):
+            if other.mask.collidepoint(x, y):
+                return True
+    return False
+
+def oracle_collision_rectangle(x1, y1, x2, y2, obj=None):
+    rect = pygame.Rect(x1, y1, x2 - x1, y2 - y1)
+    for other in objects_group:
+        if obj is None or isinstance(other, obj):
+            if rect.colliderect(other.mask):
+                return True
+    return False
+
+def build(walls, coins, size):
+    del objects_group[:]
+    spatial_index.clear()
+    random.seed(1)
+    for i in range(walls):
+        instance_create(obj_wall, random.randint(0, size), random.randint(0, size))
+    for i in range(coins):
+        instance_create(obj_coin, random.randint(0, size), random.randint(0, size))
+
+def check(queries, size):
+    for i in range(queries):
+        x = random.randint(-32, size + 32)
+        y = random.randint(-32, size + 32)
+        for obj in (None, obj_wall, obj_coin):
+            expected = oracle_place_meeting(x, y, obj)
+            assert place_meeting(x, y, obj) == expected, (x, y, obj)
+            assert place_empty(x, y, obj) != expected, (x, y, obj)
+            w = random.randint(0, 64)
+            h = random.randint(0, 64)
+            expected = oracle_collision_rectangle(x, y, x + w, y + h, obj)
+            found = collision_rectangle(x, y, x + w, y + h, obj)
+            assert (found is not None) == expected, (x, y, w, h, obj)
+
+def time_queries(function, points, obj):
+    start = timer()
+    for x, y in points:
+        function(x, y, obj)
+    return (timer() - start) / len(points) * 1000000.0
+
+if __name__ == '__main__':
+    build(300, 50, 800)
+    check(500, 800)
+    print("oracle check passed")
+
+    size = int(WALLS ** 0.5) * 32
+    build(WALLS, 0, size)
+    points = [(random.randint(0, size), random.randint(0, size)) for i in range(QUERIES)]
+    grid = time_queries(place_empty, points, obj_wall)
+    scan = time_queries(oracle_place_meeting, points[:QUERIES // 100], obj_wall)
+    print("%d walls: place_empty %.2f us/call, linear scan %.2f us/call" % (WALLS, grid, scan))
@@ -0,0 +1,51 @@
+# Bullets created and destroyed every step, with and without an instance
+# pool: mean and worst step time, and how many instances were reused.
+# Run from the projects folder: python benchmarks/pool.py
+import os, sys
+
+os.environ.setdefault('ODIN_HEADLESS', '1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from odin import *
+
+FRAMES = 600
+
+class obj_bullet(Object):
+    sprite_index = pygame.Surface((4, 4))
+    life = 30
+
+    def event_step(self):
+        self.x += 4
+        self.life -= 1
+        if self.life == 0:
+            instance_destroy(self)
+
+class obj_gun(Object):
+    rate = 50
+
+    def event_step(self):
+        for i in range(self.rate):
+            instance_create(obj_bullet, self.x, self.y + i * 4)
+
+class room_guns(Room):
+    background_color = (0, 0, 0)
+
+    def create_event(self):
+        for i in range(4):
+            instance_create(obj_gun, 0, i * 120)
+
+def run(pool_size, rate):
+    obj_bullet.pool_size = pool_size
+    obj_gun.rate = rate
+    instance_pools.clear()
+    instance_pool_counts.clear()
+    results = run_frames(room_guns, FRAMES, draw=False)
+    steps = [(times['step'] + times['update'] + times['collision']) * 1000.0 for times in results]
+    stats = instance_pool_stats().get('obj_bullet', {})
+    return sum(steps) / len(steps), max(steps), stats.get('reuse_rate', 0.0)
+
+if __name__ == '__main__':
+    print("%8s %10s %10s %10s %10s" % ("rate", "pool", "mean ms", "max ms", "reused"))
+    for rate in (10, 50, 200):
+        for pool_size in (0, 8192):
+            mean, worst, reused = run(pool_size, rate)
+            print("%8d %10d %10.3f %10.3f %9.0f%%" % (rate, pool_size, mean, worst, reused * 100.0))
@@ -0,0 +1,99 @@
+# Pixel perfect collisions between round sprites: checks instance_meeting
+# and collision_instances against a pixel by pixel scan, then compares
+# the cost of rect, precise and cached precise collision steps.
+# Run from the projects folder: python benchmarks/precise.py
+import os, sys, random
+from timeit import default_timer as timer
+
+os.environ.setdefault('ODIN_HEADLESS', '1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from odin import *
+
+FRAMES = 60
+MOVERS = 200
+
+def ball(color, size):
+    surface = pygame.Surface((size, size), pygame.SRCALPHA)
+    pygame.draw.circle(surface, color, (size // 2, size // 2), size // 2)
+    return Sprite(surface, precise=True)
+
+class obj_rock(Object):
+    sprite_index = ball((120, 120, 120), 32)
+
+class obj_mover(Object):
+    sprite_index = ball((200, 40, 40), 16)
+    hits = 0
+
+    def event_step(self):
+        self.x += random.choice((-2, 2))
+        self.y += random.choice((-2, 2))
+
+class obj_mover_rect(obj_mover):
+    def event_collision(self, obj=obj_rock):
+        if rect_meeting(self.mask, obj, self):
+            obj_mover.hits += 1
+
+class obj_mover_precise(obj_mover):
+    def event_collision(self, obj=obj_rock):
+        if instance_meeting(self, obj):
+            obj_mover.hits += 1
+
+def pixels_touch(a, b):
+    # Oracle: any pair of opaque pixels on the same screen position.
+    mask_a = a.sprite_index.mask(a.image_index)
+    mask_b = b.sprite_index.mask(b.image_index)
+    width, height = mask_a.get_size()
+    other_width, other_height = mask_b.get_size()
+    if not pygame.Rect(int(a.x), int(a.y), width, height).colliderect(
+            pygame.Rect(int(b.x), int(b.y), other_width, other_height)):
+        return False
+    for y in range(height):
+        for x in range(width):
+            if mask_a.get_at((x, y)):
+                ox = int(a.x) + x - int(b.x)
+                oy = int(a.y) + y - int(b.y)
+                if 0 <= ox < other_width and 0 <= oy < other_height and mask_b.get_at((ox, oy)):
+                    return True
+    return False
+
+def build(count, mover):
+    instance_clear()
+    random.seed(0)
+    side = int(count ** 0.5) + 1
+    for i in range(count):
+        instance_create(obj_rock, (i % side) * 40, (i // side) * 40)
+    for i in range(MOVERS):
+        instance_create(mover, random.randint(0, side * 40), random.randint(0, side * 40))
+
+def check():
+    build(400, obj_mover_precise)
+    movers = instances_of(obj_mover)
+    rocks = instances_of(obj_rock)
+    for frame in range(10):
+        game_step()
+        for instance in movers:
+            expected = [rock for rock in rocks if pixels_touch(instance, rock)]
+            assert sorted(collision_instances(instance, obj_rock)) == sorted(expected)
+            assert instance_meeting(instance, obj_rock) == bool(expected)
+
+def frame_time(count, mover, cache=0):
+    build(count, mover)
+    precise_collider.clear()
+    precise_collision_cache(cache)
+    obj_mover.hits = 0
+    start = timer()
+    for frame in range(FRAMES):
+        game_step()
+    precise_collision_cache(0)
+    return (timer() - start) / FRAMES * 1000.0, obj_mover.hits
+
+if __name__ == '__main__':
+    check()
+    print("precise collisions match the pixel scan")
+    print("%8s %16s %16s %16s" % ("rocks", "rect ms (hits)", "precise ms", "cached ms"))
+    for count in (500, 2000, 5000):
+        rect = frame_time(count, obj_mover_rect)
+        precise = frame_time(count, obj_mover_precise)
+        cached = frame_time(count, obj_mover_precise, 65536)
+        print("%8d %9.2f (%4d) %9.2f (%4d) %9.2f (%4d)" % ((count,) + rect + precise + cached))
+    print(precise_collision_stats())
@@ -0,0 +1,87 @@
+# Room restarts and returns to a room: building it again with its create
+# events, restoring a snapshot, and swapping a persistent room back in.
+# Run from the projects folder: python benchmarks/rooms.py
+import os, sys, random
+from timeit import default_timer as timer
+
+os.environ.setdefault('ODIN_HEADLESS', '1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from odin import *
+
+REPEATS = 10
+
+def block(color, size):
+    sprite = pygame.Surface((size, size))
+    sprite.fill(color)
+    return sprite.convert()
+
+class obj_wall(Object):
+    sprite_index = block((90, 90, 90), 16)
+
+class obj_coin(Object):
+    sprite_index = block((220, 200, 40), 8)
+
+    def event_create(self):
+        self.value = random.choice((1, 5, 10))
+        self.neighbours = instances_of(obj_coin)[-3:]
+        alarm_set(self, 0, 30)
+
+def level(columns, rows):
+    rng = random.Random(0)
+    return ["".join(rng.choice("W  c") for column in range(columns)) for row in range(rows)]
+
+class room_level(Room):
+    background_color = (0, 0, 0)
+    columns = 100
+    rows = 60
+
+    def create_event(self):
+        for row, line in enumerate(level(self.columns, self.rows)):
+            for column, char in enumerate(line):
+                if char == "W":
+                    instance_create(obj_wall, column * 16, row * 16)
+                elif char == "c":
+                    instance_create(obj_coin, column * 16 + 4, row * 16 + 4)
+
+class room_copied(room_level):
+    snapshot = True
+
+class room_persistent(room_level):
+    persistent = True
+
+class room_other(Room):
+    background_color = (0, 0, 0)
+
+    def create_event(self):
+        pass
+
+def restart_time(room):
+    change_room(room)
+    start = timer()
+    for i in range(REPEATS):
+        room_restart()
+    return (timer() - start) / REPEATS * 1000.0
+
+def return_time(room):
+    change_room(room)
+    start = timer()
+    for i in range(REPEATS):
+        change_room(room_other)
+        change_room(room)
+    return (timer() - start) / REPEATS * 1000.0
+
+if __name__ == '__main__':
+    change_room(room_level)
+    print("%d instances" % len(objects_group))
+    print("%-24s %10s" % ("", "ms"))
+    print("%-24s %10.2f" % ("restart, create events", restart_time(room_level)))
+    print("%-24s %10.2f" % ("restart, snapshot", restart_time(room_copied)))
+    print("%-24s %10.2f" % ("return, create events", return_time(room_level)))
+    print("%-24s %10.2f" % ("return, snapshot", return_time(room_copied)))
+    print("%-24s %10.2f" % ("return, persistent", return_time(room_persistent)))
+    start = timer()
+    room_preload(room_level)
+    preload = (timer() - start) * 1000.0
+    start = timer()
+    change_room(room_level)
+    print("%-24s %10.2f (preload %.2f)" % ("enter, preloaded", (timer() - start) * 1000.0, preload))
@@ -0,0 +1,35 @@
+# Cost of playing a sound from event code: loading it on every play
+# against sound_play with the preloaded bank and its channel pool.
+# Run from the projects folder: python benchmarks/sound.py
+import os, sys
+from timeit import default_timer as timer
+
+os.environ.setdefault('ODIN_HEADLESS', '1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from odin import *
+
+PLAYS = 2000
+PATH = os.path.join("sounds", "snd_jump.ogg")
+
+def naive():
+    start = timer()
+    for i in range(PLAYS):
+        pygame.mixer.Sound(PATH).play()
+    return (timer() - start) / PLAYS * 1000000.0
+
+def pooled(sound):
+    start = timer()
+    for i in range(PLAYS):
+        sound_play(sound, 0, i % 3)
+    return (timer() - start) / PLAYS * 1000000.0
+
+if __name__ == '__main__':
+    if not sound_bank.enabled:
+        print("no mixer, nothing to measure")
+        sys.exit()
+    snd_jump = create_sound("snd_jump.ogg")
+    assert create_sound("snd_jump.ogg") is snd_jump
+    print("%-28s %8.1f us" % ("Sound(path).play()", naive()))
+    sound_stop_all()
+    print("%-28s %8.1f us" % ("sound_play (preloaded)", pooled(snd_jump)))
+    print(sound_stats())
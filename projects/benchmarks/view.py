@@ -0,0 +1,85 @@
+# Draw cost of rooms bigger than the screen, drawn whole against through
+# a view following an instance. The view frame is first checked against
+# the same part of the whole room drawn on a big surface.
+# Run from the projects folder: python benchmarks/view.py
+import os, sys, random
+from timeit import default_timer as timer
+
+os.environ.setdefault('ODIN_HEADLESS', '1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import odin
+from odin import *
+
+FRAMES = 60
+
+def block(color, size):
+    sprite = pygame.Surface((size, size))
+    sprite.fill(color)
+    return sprite.convert()
+
+class obj_wall(Object):
+    sprite_index = block((90, 90, 90), 32)
+
+class obj_tree(Object):
+    sprite_index = block((40, 160, 40), 24)
+    depth = -1
+
+class obj_walker(Object):
+    sprite_index = block((200, 40, 40), 16)
+
+    def event_step(self):
+        self.x += 3
+        self.y += 2
+
+class room_big(Room):
+    background_color = (0, 0, 0)
+    size = 4096
+    use_view = True
+
+    def create_event(self):
+        self.width = self.height = self.size
+        random.seed(0)
+        self.tile_layer(["W" * (self.size // 32)], {"W": obj_wall})
+        for i in range(self.size * self.size // 8192):
+            instance_create(obj_tree, random.randint(0, self.size), random.randint(0, self.size))
+        walker = instance_create(obj_walker, 100, 100)
+        if self.use_view:
+            view_set(walker)
+
+def check():
+    room_big.size = 1024
+    room_big.use_view = True
+    change_room(room_big)
+    for frame in range(150):
+        game_events()
+        game_step()
+    game_draw()
+    seen = screen.copy()
+    x, y = odin.view.x, odin.view.y
+    assert (x, y) != (0, 0)
+    whole = pygame.Surface((room_big.size, room_big.size)).convert()
+    display = odin.screen
+    odin.screen = whole
+    try:
+        view_clear()
+        game_draw()
+    finally:
+        odin.screen = display
+    expected = whole.subsurface(pygame.Rect(x, y, seen.get_width(), seen.get_height()))
+    for py in range(0, seen.get_height(), 3):
+        for px in range(0, seen.get_width(), 3):
+            assert seen.get_at((px, py)) == expected.get_at((px, py)), (px, py)
+
+def frame_time(size, use_view):
+    room_big.size = size
+    room_big.use_view = use_view
+    results = run_frames(room_big, FRAMES)
+    return sum(times['draw'] for times in results) / FRAMES * 1000.0
+
+if __name__ == '__main__':
+    check()
+    print("view frame matches the whole room")
+    print("%8s %10s %12s %12s" % ("size", "instances", "whole ms", "view ms"))
+    for size in (1024, 2048, 4096, 8192):
+        whole = frame_time(size, False)
+        print("%8d %10d %12.2f %12.2f" % (size, len(objects_group), whole, frame_time(size, True)))
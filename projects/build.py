@@ -1,10 +1,12 @@
 import json
 import os, sys, subprocess
+import pygame
 
 json_data=open('example.project.json')
 data = json.load(json_data)
 debug = True
 indent = "    "
+atlas_size = 1024
 
 def Imports():
     imports = []
@@ -35,6 +37,67 @@ def Sprites():
 
     return sprites
 
+def Sounds():
+    sounds = ["\n#Sounds --------------------------------"]
+    for s in data.get("sounds", {}):
+        sounds.append( s + " = create_sound(\"" + data["sounds"][s] + "\")")
+
+    return sounds
+
+def Atlas():
+    # Packs the project sprites into a few atlas pages (sprites/atlas_N.png)
+    # and lists where each one went in sprites/atlas.json, create_sprite()
+    # then cuts them out of the pages instead of loading every file.
+    images = []
+    for s in data["sprites"]:
+        name = data["sprites"][s]
+        image = pygame.image.load(os.path.join("sprites", name))
+        alpha = False
+        if image.get_flags() & pygame.SRCALPHA:
+            w, h = image.get_size()
+            alpha = pygame.mask.from_surface(image, 254).count() < w * h
+        images.append((name, image, alpha))
+
+    pages = []
+    sprites = {}
+    for alpha in (False, True):
+        group = [i for i in images if i[2] == alpha]
+        group.sort(key=lambda i: (-i[1].get_height(), i[0]))
+        page = None
+        for name, image, flag in group:
+            w, h = image.get_size()
+            if page is None or page["x"] + w > atlas_size:
+                if page is not None and page["y"] + page["shelf"] + h <= atlas_size:
+                    page["y"] += page["shelf"]
+                    page["x"] = page["shelf"] = 0
+                else:
+                    page = {"x": 0, "y": 0, "shelf": 0, "alpha": alpha, "items": []}
+                    pages.append(page)
+            page["items"].append((name, image, page["x"], page["y"]))
+            sprites[name] = {"page": len(pages) - 1, "rect": [page["x"], page["y"], w, h]}
+            page["x"] += w
+            page["shelf"] = max(page["shelf"], h)
+
+    index = {"pages": [], "sprites": sprites}
+    for n, page in enumerate(pages):
+        height = page["y"] + page["shelf"]
+        width = max([x + image.get_width() for name, image, x, y in page["items"]])
+        if page["alpha"]:
+            # MAX onto the cleared page copies the pixels, alpha included.
+            surface = pygame.Surface((width, height), pygame.SRCALPHA, 32)
+            for name, image, x, y in page["items"]:
+                surface.blit(image, (x, y), None, pygame.BLEND_RGBA_MAX)
+        else:
+            surface = pygame.Surface((width, height), 0, 24)
+            for name, image, x, y in page["items"]:
+                surface.blit(image, (x, y))
+        filename = "atlas_" + str(n) + ".png"
+        pygame.image.save(surface, os.path.join("sprites", filename))
+        index["pages"].append({"file": filename, "alpha": page["alpha"]})
+
+    with open(os.path.join("sprites", "atlas.json"), "w") as f:
+        json.dump(index, f, indent=4, sort_keys=True)
+
 def Objects():
     objects = ["\n#Objects ------------------------------"]
     for o in data["objects"]:
@@ -95,10 +158,12 @@ def GameLoop():
 
 json_data.close()
 
+Atlas()
+
 with open('main.py', 'w') as file:
     text = "#This file was generated with Stellar\n"
 
-    parts = [Imports(), Scripts(), Sprites(), Objects(), Rooms(), GameLoop()]
+    parts = [Imports(), Scripts(), Sprites(), Sounds(), Objects(), Rooms(), GameLoop()]
     for part in parts:
         for line in part:
             text+= line + "\n"
@@ -14,6 +14,9 @@ spr_wall = create_sprite("spr_wall.png")
 spr_player = create_sprite("spr_player.png")
 spr_coin = create_sprite("spr_coin.png", 1)
 
+#Sounds --------------------------------
+snd_jump = create_sound("snd_jump.ogg")
+
 #Objects ------------------------------
 class obj_coin(Object):
     visible = True
@@ -33,23 +36,21 @@ class obj_player(Object):
     def event_step(self):
         self.xprevious = self.x
         self.yprevious = self.y
-        obj = obj_coin
-        for other in objects_group:
-            if other.__class__ == obj:
-                if distance_to_object(self, other)<16:
-                    instance_destroy(other)
+        for other in instances_of(obj_coin):
+            if distance_to_object(self, other)<16:
+                instance_destroy(other)
 
         if keyboard_check(vk_right):
-            if place_empty(self.x+1+32, self.y):
+            if place_empty(self.x+1+32, self.y, obj_wall):
                 self.x += self.speed
         if keyboard_check(vk_left):
-            if place_empty(self.x-1, self.y):
+            if place_empty(self.x-1, self.y, obj_wall):
                 self.x -= self.speed
         if keyboard_check(vk_up):
-            if place_empty(self.x, self.y-1):
+            if place_empty(self.x, self.y-1, obj_wall):
                 self.y -= self.speed
         if keyboard_check(vk_down):
-            if place_empty(self.x, self.y+1+32):
+            if place_empty(self.x, self.y+1+32, obj_wall):
                 self.y += self.speed
 
         if keyboard_check(pygame.K_r):
@@ -57,11 +58,9 @@ class obj_player(Object):
 
 
     def event_collision(self, obj = obj_wall):
-        for other in objects_group:
-            if other.__class__ == obj:
-                if self.mask.colliderect(other.mask):
-                    self.x = self.xprevious
-                    self.y = self.yprevious
+        if rect_meeting(self.mask, obj, self):
+            self.x = self.xprevious
+            self.y = self.yprevious
 
 
 
@@ -88,11 +87,10 @@ class room_1(Room):
             "W     W        W   W",
             "WWWWWWWWWWWWWWWWWWWW",
         ]
+        self.tile_layer(level, {"W": obj_wall})
         x = y = 0
         for row in level:
             for col in row:
-                if col == "W":
-                    instance_create(obj_wall, x, y)
                 if col == "E":
                     instance_create(obj_player, x, y)
                 if col == "c":
@@ -2,7 +2,29 @@ import pygame
 import os 
 import sys
 import math
+import json
+import csv
+import copy
+import random
+import hashlib
+from timeit import default_timer as timer
 from keys import *
+from spatial import SpatialIndex
+from batch import Batch, column
+from tiles import TileLayer
+from render import DrawQueue, DirtyRenderer
+from profiler import FrameProfiler
+from text import TextCache
+from sprite import Sprite, sprite_image, sprite_sheet
+from collision import PreciseCollider
+from input import InputState, KEY_EVENTS
+from alarms import Scheduler
+from view import View
+from path import NavGrid
+from snapshot import copy_instances, copy_value
+from sound import SoundBank
+from particles import ParticleSystem, ParticleType, Emitter
+from replay import ReplayWriter, ReplayReader, ReplayError, CHECKPOINT
 
 def set_icon(icon):
     pygame.display.set_icon(icon)
@@ -13,6 +35,12 @@ def set_caption(string):
 
 ODIN_DIR = os.path.dirname(__file__)
 os.environ['SDL_VIDEO_CENTERED'] = '1'
+# ODIN_HEADLESS=1 runs without a display or sound card (CI, benchmarks),
+# start_game then simulates ODIN_FRAMES frames as fast as it can.
+HEADLESS = os.environ.get('ODIN_HEADLESS') == '1'
+if HEADLESS:
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
 pygame.init()
 set_icon(pygame.image.load(os.path.join(ODIN_DIR, "icon.png")))
 set_caption("Caption")
@@ -27,111 +55,1011 @@ draw_color = (0,0,0)
 # Instantiate 16 point Courier font to draw text.
 my_font = pygame.font.SysFont("Courier", 16)
 
-class Object(object):
+class ObjectBase(object):
+    # Core fields live in slots, Object adds a __dict__ on top of them.
+    __slots__ = ('x', 'y', 'xprevious', 'yprevious', 'speed', 'hspeed',
+                 'vspeed', 'mask', 'id', 'destroyed', 'image_index')
+    simple = False
+    batched = False
+    visible = True
+    # Instances with a higher depth are drawn first (further back).
+    depth = 0
+    sprite_index = None
+    # Sprite frames advanced per step.
+    image_speed = 1
+    # Destroyed instances kept for instance_create to reuse, 0 for none.
+    pool_size = 0
+    # Opt-in for classes that only act in their alarms: with the stock step,
+    # update and collision events and a still sprite, the step skips their
+    # instances. Code moving them outside of their alarms must call their
+    # event_update() to keep the mask in step.
+    idle = False
+
     def __init__(self, x, y):
-        super(Object, self).__init__()
+        super(ObjectBase, self).__init__()
+        self.x = x
+        self.y = y
+        self.xprevious = x
+        self.yprevious = y
+        self.image_index = 0
+        sprite = self.sprite_index
+        if sprite is None:
+            self.mask = pygame.Rect(x, y, 32, 32)
+        elif sprite.__class__ is Sprite:
+            self.mask = sprite.boxes[0].move(x, y)
+        else:
+            self.mask = pygame.Rect((x, y), sprite.get_size())
+        self.id = next_instance_id()
+        self.destroyed = False
+
+    def recycle(self, x, y):
+        # Back to the state of a new instance, reusing the mask rect and
+        # the __dict__. Extra __slots__ keep their values for event_create
+        # to set.
+        attributes = getattr(self, '__dict__', None)
+        if attributes:
+            attributes.clear()
+        # Unset, as on a new instance (or shadowed by a class attribute).
+        for name in ('speed', 'hspeed', 'vspeed'):
+            try:
+                delattr(self, name)
+            except AttributeError:
+                pass
         self.x = x
         self.y = y
-        self.mask = pygame.Rect(32, 32, 32, 32)
+        self.xprevious = x
+        self.yprevious = y
+        self.image_index = 0
+        mask = self.mask
+        sprite = self.sprite_index
+        if sprite is None:
+            mask.topleft = (x, y)
+            mask.size = (32, 32)
+        elif sprite.__class__ is Sprite:
+            box = sprite.boxes[0]
+            mask.topleft = (x + box.x, y + box.y)
+            mask.size = box.size
+        else:
+            mask.topleft = (x, y)
+            mask.size = sprite.get_size()
+        self.id = next_instance_id()
+        self.destroyed = False
 
     def event_create(self):
         pass
 
     def event_update(self):
-        self.mask.x = self.x
-        self.mask.y = self.y 
+        mask = self.mask
+        sprite = self.sprite_index
+        if sprite.__class__ is Sprite:
+            if sprite.count > 1:
+                self.image_index = (self.image_index + self.image_speed) % sprite.count
+            # The mask follows the bounding box of the current frame.
+            box = sprite.boxes[int(self.image_index)]
+            mask.x = self.x + box.x
+            mask.y = self.y + box.y
+            mask.width = box.width
+            mask.height = box.height
+        else:
+            mask.x = self.x
+            mask.y = self.y
+        if not self.destroyed:
+            spatial_index.update(self)
 
     def event_step(self):
         pass
 
     def event_draw(self):
-        draw_sprite(self.sprite_index, 0, self.x, self.y)
+        draw_sprite(self.sprite_index, self.image_index, self.x, self.y)
 
     def event_collision(self, other=None):
         pass
 
+    def event_alarm(self, number):
+        # Runs event_alarm<number>, as set by alarm_set().
+        event = getattr(self, 'event_alarm%d' % number, None)
+        if event is not None:
+            event()
+
+class Object(ObjectBase):
+    pass
+
+class CompactMeta(type):
+    # Gives every subclass an empty __slots__ unless it declares its own,
+    # so no instance of a CompactObject ever gets a __dict__.
+    def __new__(meta, name, bases, namespace):
+        namespace.setdefault('__slots__', ())
+        return type.__new__(meta, name, bases, namespace)
+
+# Opt-in layout for rooms with lots of tiles or particles: instances only
+# hold the ObjectBase fields (plus any __slots__ the class declares).
+CompactObject = CompactMeta('CompactObject', (ObjectBase,), {})
+
+class BatchMeta(CompactMeta):
+    # A batched class is "simple" when the batch can do all its per-frame
+    # work, that is when it does not define its own step/update/collision.
+    def __new__(meta, name, bases, namespace):
+        cls = CompactMeta.__new__(meta, name, bases, namespace)
+        cls.simple = True
+        for klass in cls.__mro__:
+            if klass is BatchObjectBase:
+                break
+            for event in ('event_step', 'event_update', 'event_collision'):
+                if event in vars(klass):
+                    cls.simple = False
+        return cls
+
+class BatchObjectBase(CompactObject):
+    # Position and speed live in the class' Batch (NumPy columns) and are
+    # advanced by batch_step() every frame: x += hspeed, y += vspeed.
+    __slots__ = ('batch', 'index')
+    simple = False
+    batched = True
+    x = column('x')
+    y = column('y')
+    xprevious = column('xprevious')
+    yprevious = column('yprevious')
+    hspeed = column('hspeed')
+    vspeed = column('vspeed')
+
+    def __init__(self, x, y):
+        self.batch = object_batch(self.__class__)
+        self.index = self.batch.add(self)
+        super(BatchObjectBase, self).__init__(x, y)
+
+    @property
+    def mask(self):
+        batch = self.batch
+        index = self.index
+        return pygame.Rect(int(batch.x[index]), int(batch.y[index]),
+                           batch.mask_width[index], batch.mask_height[index])
+
+    @mask.setter
+    def mask(self, rect):
+        self.batch.mask_width[self.index] = rect[2]
+        self.batch.mask_height[self.index] = rect[3]
+
+    def event_update(self):
+        if not self.destroyed:
+            spatial_index.update(self)
+
+BatchObject = BatchMeta('BatchObject', (BatchObjectBase,), {})
+
 class Room(object):
+    # Keep the instances when leaving the room, to find them again as
+    # they were when coming back.
+    persistent = False
+    # Restart from a copy of the instances taken after the first creation
+    # instead of running the create events again.
+    snapshot = False
+
     def __init__(self):
         super(Room, self).__init__()
+        self.tile_layers = []
 
     def event_create(self):
         pass
     def event_step(self):
         pass
+    def preload_event(self):
+        # Loads what the room needs (sprites, sounds) before room_preload()
+        # builds it.
+        pass
     def event_draw(self):
         screen.fill(self.background_color)
+        for layer in self.tile_layers:
+            layer.draw(screen, draw_origin)
+
+    def tile_layer(self, level, tiles, tile_size=32, x=0, y=0):
+        #Lays the level grid out as static tiles, tiles maps each character
+        #to the object class it stands for (drawn with its sprite_index)
+        key = (tuple(level), tuple(sorted(tiles.items(), key=lambda item: item[0])),
+               tile_size, x, y)
+        layer = tile_cache.get(key)
+        if layer is None:
+            layer = tile_cache[key] = TileLayer(level, tiles, tile_size, x, y)
+        self.tile_layers.append(layer)
+        return layer
 
 ########################
 # Resources management #
 ########################
 sprites_group = []
 objects_group = []
+# Rendered tile layers by level, shared by restarts of the same room.
+tile_cache = {}
+# Broadphase for collisions, one bucket per 32px tile and per class.
+spatial_index = SpatialIndex(32)
+# Live instances of every object class, including inherited ones.
+instance_registry = {}
+instance_counts = {}
+# Stable handles, instance.id -> instance.
+instance_ids = {}
+instance_next_id = 100000
 
-def create_sprite(sprite_name, alpha=0):
-    if alpha == 0:
-        spr = pygame.image.load(os.path.join("sprites", sprite_name)).convert()
-    else:
-        spr = pygame.image.load(os.path.join("sprites", sprite_name)).convert_alpha()
-    sprites_group.append(spr)
+def next_instance_id():
+    global instance_next_id
+    instance_next_id += 1
+    return instance_next_id
+# Instances the step runs the events of, in creation order (None until it
+# is built again from objects_group), see instance_dispatched().
+instances_stepped = None
+# Destroyed instances stay in place (flagged) until instance_cleanup().
+instance_graveyard = []
+# Cleaned up instances of classes with a pool_size, waiting for reuse,
+# and class -> [created, recycled] counts.
+instance_pools = {}
+instance_pool_counts = {}
+# Whether instance_create runs event_create (once the room creation is
+# over, it runs them itself then), the same for pooled classes or not.
+instance_create_events = False
+# NumPy columns of every BatchObject class, in creation order.
+batches = {}
+batches_order = []
+
+# Sprites by (file, alpha, frames), each file is loaded once.
+sprite_cache = {}
+# sprites/atlas.json written by build.py, and its pages once loaded.
+sprite_atlas = None
+atlas_pages = {}
+
+def load_atlas():
+    global sprite_atlas
+    if sprite_atlas is None:
+        sprite_atlas = {"pages": [], "sprites": {}}
+        path = os.path.join("sprites", "atlas.json")
+        if os.path.exists(path):
+            with open(path) as f:
+                sprite_atlas = json.load(f)
+    return sprite_atlas
+
+def atlas_sprite(sprite_name, alpha):
+    #Returns the sprite cut out of its atlas page, or None if it is not in
+    #the atlas (or only with the other alpha setting)
+    entry = load_atlas()["sprites"].get(sprite_name)
+    if entry is None:
+        return None
+    info = sprite_atlas["pages"][entry["page"]]
+    if info["alpha"] != bool(alpha):
+        return None
+    page = atlas_pages.get(entry["page"])
+    if page is None:
+        page = pygame.image.load(os.path.join("sprites", info["file"]))
+        page = page.convert_alpha() if info["alpha"] else page.convert()
+        # Sprites cut out of the page share its pixels.
+        page = atlas_pages[entry["page"]] = sprite_sheet(page)
+    return page.subsurface(pygame.Rect(entry["rect"]))
+
+def create_sprite(sprite_name, alpha=0, frames=1, precise=False):
+    #frames > 1 cuts the image into that many frames side by side, precise
+    #builds the pixel masks of the frames right away
+    key = (sprite_name, bool(alpha), frames)
+    spr = sprite_cache.get(key)
+    if spr is None:
+        image = atlas_sprite(sprite_name, alpha)
+        if image is None:
+            if alpha == 0:
+                image = pygame.image.load(os.path.join("sprites", sprite_name)).convert()
+            else:
+                image = pygame.image.load(os.path.join("sprites", sprite_name)).convert_alpha()
+        spr = sprite_cache[key] = Sprite(image, frames)
+        sprites_group.append(spr)
+    if precise:
+        for index in range(spr.count):
+            spr.mask(index)
     return spr
 
+# Decoded sounds and the mixer channels they play on, see odin/sound.py.
+sound_bank = SoundBank(16)
+
+def create_sound(sound_name):
+    #Loads and decodes sounds/sound_name once, None without a sound card
+    return sound_bank.load(os.path.join("sounds", sound_name))
+
 
 ##################
 # Draw Functions #
 ##################
+# World position of the top left of the screen, while the room is drawn
+# through a view.
+draw_origin = [0, 0]
+
 def draw_sprite(sprite, subimg, x, y):
-    screen.blit(sprite, (x,y))
+    rect = screen.blit(sprite_image(sprite, subimg), (x - draw_origin[0], y - draw_origin[1]))
+    if dirty_renderer.capture is not None:
+        dirty_renderer.capture.append(rect)
 
 def draw_set_color(color):
     global draw_color
     draw_color = color
 
+# Rendered strings (LRU) and digit glyphs, see odin/text.py.
+text_cache = TextCache(256)
+
 def draw_text(x, y, string):
     global draw_color
-    the_text = my_font.render(string, True, draw_color)
-    screen.blit(the_text, (x, y))
+    rect = text_cache.draw(screen, my_font, string, draw_color,
+                           x - draw_origin[0], y - draw_origin[1])
+    if dirty_renderer.capture is not None:
+        dirty_renderer.capture.append(rect)
 
+def text_cache_stats():
+    #Hits, misses and size of the rendered text cache
+    return text_cache.stats()
+
+# Opt-in: redraw and push only the changed parts of the screen. The room
+# background (event_draw and tile layers) is drawn once per room.
+dirty_rendering = False
+draw_queue = DrawQueue(ObjectBase.__dict__['event_draw'])
+dirty_renderer = DirtyRenderer(draw_queue)
+
+def draw_set_dirty_rects(state):
+    global dirty_rendering
+    dirty_rendering = state
+    dirty_renderer.invalidate()
+
+
+def object_ancestors(obj):
+    return [cls for cls in obj.__mro__ if issubclass(cls, ObjectBase)]
 
 def instance_create(obj, x, y):
-    i = obj(x, y)
+    pool = instance_pool(obj) if obj.pool_size else None
+    if pool is not None:
+        counts = instance_pool_counts[obj]
+        if pool:
+            i = pool.pop()
+            i.recycle(x, y)
+            counts[1] += 1
+        else:
+            i = obj(x, y)
+            counts[0] += 1
+    else:
+        i = obj(x, y)
+    instance_ids[i.id] = i
     objects_group.append(i)
+    if instances_stepped is not None and instance_dispatched(obj):
+        instances_stepped.append(i)
+    spatial_index.insert(i)
+    draw_queue.add(i)
+    for cls in object_ancestors(obj):
+        instance_registry.setdefault(cls, []).append(i)
+        instance_counts[cls] = instance_counts.get(cls, 0) + 1
+    if nav_solid is not None and isinstance(i, nav_solid):
+        path_invalidate()
+    if instance_create_events:
+        i.event_create()
     return i
 
 def instance_destroy(self):
-    objects_group.remove(self)
+    #Flags the instance as destroyed, it is removed from the lists at the
+    #end of the frame so loops over objects_group are not disturbed
+    if self.destroyed:
+        return
+    self.destroyed = True
+    instance_graveyard.append(self)
+    instance_ids.pop(self.id, None)
+    spatial_index.remove(self)
+    for cls in object_ancestors(self.__class__):
+        instance_counts[cls] -= 1
+    if nav_solid is not None and isinstance(self, nav_solid):
+        path_invalidate()
+    if isinstance(self, BatchObject):
+        self.batch.kill(self.index)
 
-key_check = []
-def keyboard_check(what_key):
-    global key_check
-    try:
-        if key_check[what_key]:
+def instance_cleanup():
+    #Drops the destroyed instances, once per frame
+    if not instance_graveyard:
+        return
+    classes = set()
+    pooled = []
+    for instance in instance_graveyard:
+        classes.update(object_ancestors(instance.__class__))
+        if instance.pool_size and not instance.batched:
+            pooled.append(instance)
+    del instance_graveyard[:]
+    objects_group[:] = [i for i in objects_group if not i.destroyed]
+    if instances_stepped is not None:
+        instances_stepped[:] = [i for i in instances_stepped if not i.destroyed]
+    for cls in classes:
+        group = instance_registry[cls]
+        group[:] = [i for i in group if not i.destroyed]
+        if cls in batches:
+            batches[cls].compact()
+    if not pooled:
+        draw_queue.remove()
+        return
+    draw_queue.compact()
+    for instance in pooled:
+        pool = instance_pool(instance.__class__)
+        if len(pool) < instance.pool_size:
+            pool.append(instance)
+
+def instance_pool(obj):
+    #Returns the list of instances of obj waiting to be reused
+    pool = instance_pools.get(obj)
+    if pool is None:
+        pool = instance_pools[obj] = []
+        instance_pool_counts[obj] = [0, 0]
+    return pool
+
+def instance_pool_stats():
+    #Created and recycled instances of every pooled class, by class name
+    stats = {}
+    for obj, (created, recycled) in instance_pool_counts.items():
+        total = created + recycled
+        stats[obj.__name__] = {'created': created, 'recycled': recycled,
+                               'pooled': len(instance_pools[obj]),
+                               'capacity': obj.pool_size,
+                               'reuse_rate': float(recycled) / total if total else 0.0}
+    return stats
+
+def instance_clear():
+    global particle_system, room_generation, instances_stepped
+    room_generation += 1
+    instances_stepped = None
+    del objects_group[:]
+    del instance_graveyard[:]
+    spatial_index.clear()
+    instance_registry.clear()
+    instance_counts.clear()
+    instance_ids.clear()
+    batches.clear()
+    del batches_order[:]
+    draw_queue.clear()
+    scheduler.clear()
+    # The next room makes its own, from the random state it starts with.
+    particle_system = None
+
+def object_batch(obj):
+    batch = batches.get(obj)
+    if batch is None:
+        batch = batches[obj] = Batch(obj)
+        batches_order.append(batch)
+    return batch
+
+def instance_dispatched(cls):
+    #Whether the step runs the events of the instances of cls one by one,
+    #simple batched classes are moved by batch_step() alone
+    if cls.batched:
+        return not cls.simple
+    if not cls.idle:
+        return True
+    # Idle classes with nothing to do each step only run their alarms (see
+    # alarm_fire).
+    for event in ('event_step', 'event_update', 'event_collision'):
+        if getattr(cls, event).im_func is not getattr(ObjectBase, event).im_func:
             return True
-    except:
-        return False
+    sprite = cls.sprite_index
+    return sprite.__class__ is Sprite and sprite.count > 1 and cls.image_speed != 0
+
+def batch_step():
+    #Moves every BatchObject in one NumPy pass per class
+    for batch in batches_order:
+        grid = spatial_index.grid(batch.kind)
+        if grid.bulk:
+            batch.advance()
+            grid.invalidate()
+        else:
+            grid.move(*batch.step(spatial_index.cell_size))
+
+def instance_find_id(handle):
+    #Returns the live instance with the given id, or None
+    return instance_ids.get(handle)
+
+def instances_of(obj):
+    #Returns the instances of obj and its children
+    return [i for i in instance_registry.get(obj, ()) if not i.destroyed]
+
+def instance_number(obj):
+    return instance_counts.get(obj, 0)
+
+def instance_exists(obj):
+    return instance_number(obj) > 0
+
+def instance_nearest(x, y, obj=None):
+    #Returns the instance (of class obj) closest to (x,y), or None
+    return spatial_index.nearest(x, y, obj)
+
+###################
+# Alarm Functions #
+###################
+# Alarms and timers of the current room, run at the start of each logic
+# step by due step, see odin/alarms.py.
+scheduler = Scheduler()
+
+def alarm_fire(instance, number, handle):
+    # A recycled instance has a new id, its old alarms are dropped.
+    if instance.id == handle and not instance.destroyed:
+        instance.event_alarm(number)
+        if not (instance.destroyed or instance.batched or instance_dispatched(instance.__class__)):
+            # The step skips it, moves made here are not interpolated and
+            # the mask follows now.
+            instance.xprevious = instance.x
+            instance.yprevious = instance.y
+            instance.event_update()
+
+def alarm_set(self, number, steps):
+    #Runs self.event_alarm<number>() in steps logic steps, 0 or -1 turns it off
+    if steps <= 0:
+        scheduler.cancel(scheduler.keys.get((self.id, number)))
+    else:
+        scheduler.add(steps, alarm_fire, (self, number, self.id), 0, (self.id, number))
+
+def alarm_get(self, number):
+    #Returns the steps left before the alarm goes off, -1 if it is off
+    return scheduler.remaining((self.id, number))
+
+def timer_add(steps, callback, repeat=False):
+    #Calls callback() in steps logic steps (then every steps steps if
+    #repeat) and returns a handle for timer_cancel
+    return scheduler.add(steps, callback, (), steps if repeat else 0)
+
+def timer_cancel(handle):
+    scheduler.cancel(handle)
+
+
+###################
+# Input Functions #
+###################
+# Keyboard and mouse state, updated from the events once per frame, see
+# odin/input.py.
+input_state = InputState()
+
+# Scripted input: one iterable of pressed keys per frame, or None to read
+# the keyboard.
+input_script = None
+input_frame = 0
+
+def input_set_script(script):
+    global input_script, input_frame
+    input_script = script
+    input_frame = 0
+    input_state.clear()
+
+def keyboard_check(what_key):
+    #Returns whether the key is held down
+    return what_key in input_state.keys
+
+def keyboard_check_pressed(what_key):
+    #Returns whether the key went down since the last step
+    return what_key in input_state.keys_pressed
+
+def keyboard_check_released(what_key):
+    #Returns whether the key went up since the last step
+    return what_key in input_state.keys_released
+
+def mouse_check_button(button):
+    return button in input_state.buttons
+
+def mouse_check_button_pressed(button):
+    return button in input_state.buttons_pressed
+
+def mouse_check_button_released(button):
+    return button in input_state.buttons_released
+
+def mouse_position():
+    #Returns the (x, y) of the mouse on the screen
+    return input_state.mouse
+
+
+###################
+# Sound Functions #
+###################
+def sound_play(sound, loops=0, priority=0, volume=1.0):
+    #Plays a sound from create_sound on a free channel, or on the oldest
+    #one of lower or equal priority if they are all busy. Returns the
+    #channel, None if the sound was dropped.
+    return sound_bank.play(sound, loops, priority, volume)
+
+def sound_loop(sound, priority=0, volume=1.0):
+    return sound_bank.play(sound, -1, priority, volume)
+
+def sound_stop(sound):
+    if sound is not None:
+        sound.stop()
+
+def sound_stop_all():
+    sound_bank.stop()
+
+def sound_isplaying(sound):
+    return sound is not None and sound.get_num_channels() > 0
+
+def sound_stats():
+    return sound_bank.stats()
+
+def music_play(music_name, loops=-1, volume=1.0):
+    #Streams sounds/music_name from the disk while it plays, for long
+    #tracks that are not worth decoding up front
+    if not sound_bank.enabled:
+        return
+    pygame.mixer.music.load(os.path.join("sounds", music_name))
+    pygame.mixer.music.set_volume(volume)
+    pygame.mixer.music.play(loops)
+
+def music_stop():
+    if sound_bank.enabled:
+        pygame.mixer.music.stop()
+
+
+######################
+# Particle Functions #
+######################
+# Particles of the current room, kept in NumPy columns instead of being
+# instances, see odin/particles.py. Made on first use, as it needs numpy,
+# and seeded from random so replays get the same particles.
+particle_system = None
+
+def part_system():
+    global particle_system
+    if particle_system is None:
+        particle_system = ParticleSystem(seed=random.getrandbits(32))
+    return particle_system
+
+def part_type_create(color=(255, 255, 255), size=2, life=(30, 60), speed=(1.0, 3.0),
+                     direction=(0.0, 360.0), gravity=0.0):
+    #Returns a particle type for part_particles_create and emitters. life,
+    #speed and direction (degrees) are (low, high) random ranges.
+    return ParticleType(color, size, life, speed, direction, gravity)
+
+def part_particles_create(x, y, kind, number=1):
+    part_system().emit(kind, x, y, number)
+
+def part_emitter_create(x1, y1, x2, y2, kind, rate):
+    #Creates rate particles per step (fractions add up) in the rectangle
+    #until part_emitter_destroy
+    emitter = Emitter((x1, y1, x2 - x1, y2 - y1), kind, rate)
+    part_system().emitters.append(emitter)
+    return emitter
+
+def part_emitter_destroy(emitter):
+    if particle_system is not None and emitter in particle_system.emitters:
+        particle_system.emitters.remove(emitter)
+
+def part_particles_count():
+    if particle_system is None:
+        return 0
+    return particle_system.count
+
+def part_particles_clear():
+    if particle_system is not None:
+        particle_system.clear()
 
 
 ##################
 # Room Functions #
 ##################
 current_room = Room()
+# Rooms left while persistent or built by room_preload(), by class.
+room_states = {}
+# Copies of the instances of snapshot rooms, by class.
+room_snapshots = {}
+
+# Bumped whenever the instances of the room are dropped, so a step loop
+# knows to stop when an event changed or restarted the room.
+room_generation = 0
+
 def change_room(room):
-    del objects_group[:]
-    global current_room
-    current_room = room()
-    current_room.create_event()
-    current_room.background_color
-    for instance in objects_group:
-        instance.event_create()
+    if current_room.persistent:
+        room_states[current_room.__class__] = room_state_save()
+    else:
+        instance_clear()
+    state = room_states.pop(room, None)
+    if state is not None:
+        room_state_load(state)
+    elif room in room_snapshots:
+        room_snapshot_load(room_snapshots[room], room())
+    else:
+        room_start(room())
 
 def room_restart():
-    del objects_group[:]
-    global current_room
+    instance_clear()
+    del current_room.tile_layers[:]
+    snapshot = room_snapshots.get(current_room.__class__)
+    if snapshot is not None:
+        room_snapshot_load(snapshot)
+    else:
+        room_start(current_room)
+
+def room_start(room):
+    #Runs the creation of room, which becomes the current room
+    global current_room, instance_create_events, view, nav_grid, nav_solid
+    current_room = room
+    view = None
+    nav_grid = nav_solid = None
+    dirty_renderer.invalidate()
+    instance_create_events = False
     current_room.background_color
     current_room.create_event()
     for instance in objects_group:
         instance.event_create()
-    
+    instance_create_events = True
+    if current_room.snapshot and current_room.__class__ not in room_snapshots:
+        room_snapshots[current_room.__class__] = room_snapshot()
+
+def room_preload(room):
+    #Builds room (its preload_event, then its instances) now, so that
+    #change_room(room) later only has to swap it in
+    if room in room_states:
+        return
+    saved = room_state_save()
+    try:
+        preloaded = room()
+        if room in room_snapshots:
+            room_snapshot_load(room_snapshots[room], preloaded)
+        else:
+            preloaded.preload_event()
+            room_start(preloaded)
+        room_states[room] = room_state_save()
+    finally:
+        room_state_load(saved)
+
+def room_state_save():
+    #Takes the current room and its instances out of odin, leaving it
+    #empty, and returns them for room_state_load()
+    global particle_system, room_generation, instances_stepped, instance_create_events
+    room_generation += 1
+    instances_stepped = None
+    state = {'room': current_room,
+             'objects': objects_group[:],
+             'graveyard': instance_graveyard[:],
+             'registry': dict(instance_registry),
+             'counts': dict(instance_counts),
+             'ids': dict(instance_ids),
+             'batches': dict(batches),
+             'batches_order': batches_order[:],
+             'spatial': spatial_index.__dict__.copy(),
+             'draw': draw_queue.__dict__.copy(),
+             'scheduler': scheduler.__dict__.copy(),
+             'view': view,
+             'nav': (nav_grid, nav_solid, nav_dirty),
+             'particles': particle_system,
+             'create_events': instance_create_events}
+    del objects_group[:]
+    del instance_graveyard[:]
+    instance_registry.clear()
+    instance_counts.clear()
+    instance_ids.clear()
+    batches.clear()
+    del batches_order[:]
+    spatial_index.__init__(spatial_index.cell_size)
+    draw_queue.__init__(draw_queue.default_event_draw)
+    scheduler.__init__()
+    particle_system = None
+    # A room built now runs the event_create of its instances itself.
+    instance_create_events = False
+    return state
+
+def room_state_load(state):
+    global current_room, view, nav_grid, nav_solid, nav_dirty, instance_create_events
+    global particle_system, instances_stepped
+    current_room = state['room']
+    instances_stepped = None
+    objects_group[:] = state['objects']
+    instance_graveyard[:] = state['graveyard']
+    instance_registry.clear()
+    instance_registry.update(state['registry'])
+    instance_counts.clear()
+    instance_counts.update(state['counts'])
+    instance_ids.clear()
+    instance_ids.update(state['ids'])
+    batches.clear()
+    batches.update(state['batches'])
+    batches_order[:] = state['batches_order']
+    spatial_index.__dict__.update(state['spatial'])
+    draw_queue.__dict__.update(state['draw'])
+    scheduler.__dict__.update(state['scheduler'])
+    view = state['view']
+    nav_grid, nav_solid, nav_dirty = state['nav']
+    particle_system = state['particles']
+    instance_create_events = state['create_events']
+    dirty_renderer.invalidate()
+
+def room_snapshot():
+    #Copies the instances of the current room (and their alarms, the view
+    #and the room's attributes) for room_snapshot_load()
+    instance_cleanup()
+    originals = dict((batch, batch.copy()) for batch in batches_order)
+    instances, copies = copy_instances(objects_group, originals)
+    alarms = [(entry[0] - scheduler.frame, entry[2], copy_value(entry[3], copies), entry[4], entry[5])
+              for entry in scheduler.heap if entry[2] is not None]
+    camera = None
+    if view is not None:
+        camera = copy.copy(view)
+        camera.follow = copies.get(id(view.follow), view.follow)
+    grid = None
+    if nav_grid is not None:
+        grid = (nav_solid, nav_grid.cell_size, nav_grid.diagonal)
+    classes = dict((batch, cls) for cls, batch in batches.items())
+    return {'instances': instances,
+            'batches': [(classes[batch], originals[batch]) for batch in batches_order],
+            'room': dict((name, copy_value(value, copies))
+                         for name, value in current_room.__dict__.items()),
+            'alarms': alarms,
+            'view': camera,
+            'nav': grid}
+
+def room_snapshot_load(snapshot, room=None):
+    #Fills the (empty) current room, or room, with copies of a
+    #room_snapshot()
+    global current_room, view, nav_grid, nav_solid, instance_create_events
+    global instances_stepped
+    instances_stepped = None
+    if room is not None:
+        current_room = room
+    originals = dict((batch, batch.copy()) for cls, batch in snapshot['batches'])
+    instances, copies = copy_instances(snapshot['instances'], originals)
+    for cls, batch in snapshot['batches']:
+        batches[cls] = originals[batch]
+        batches_order.append(originals[batch])
+    ancestors = {}
+    for i in instances:
+        cls = i.__class__
+        classes = ancestors.get(cls)
+        if classes is None:
+            classes = ancestors[cls] = object_ancestors(cls)
+        for base in classes:
+            instance_registry.setdefault(base, []).append(i)
+            instance_counts[base] = instance_counts.get(base, 0) + 1
+        instance_ids[i.id] = i
+        spatial_index.insert(i)
+        draw_queue.add(i)
+    objects_group[:] = instances
+    current_room.__dict__.update((name, copy_value(value, copies))
+                                 for name, value in snapshot['room'].items())
+    for steps, action, args, period, key in snapshot['alarms']:
+        scheduler.add(steps, action, copy_value(args, copies), period, key)
+    view = None
+    nav_grid = nav_solid = None
+    if snapshot['view'] is not None:
+        view = copy.copy(snapshot['view'])
+        view.follow = copies.get(id(view.follow), view.follow)
+    if snapshot['nav'] is not None:
+        path_grid(*snapshot['nav'])
+    dirty_renderer.invalidate()
+    instance_create_events = True
+
+
+##################
+# View Functions #
+##################
+# Camera for rooms bigger than the screen, see odin/view.py. Only the
+# instances the spatial index finds in view are drawn, and with an
+# activation margin only those around it are stepped.
+view = None
+
+def view_set(follow=None, width=None, height=None):
+    #Draws the room through a view (screen sized by default) following
+    #the instance follow, if given
+    global view
+    view = View(width or screen_size[0], height or screen_size[1])
+    view.follow = follow
+    view.update(getattr(current_room, 'width', 0), getattr(current_room, 'height', 0))
+    dirty_renderer.invalidate()
+    return view
+
+def view_clear():
+    global view
+    view = None
+    dirty_renderer.invalidate()
+
+def view_set_activation(margin):
+    #Only steps instances within margin pixels of the view, None for all
+    if view is None:
+        # Without a view every instance is stepped already.
+        if margin is None:
+            return
+        raise RuntimeError("no view in this room, call view_set() before view_set_activation()")
+    view.activation = margin
 
+def view_to_world(x, y):
+    #Screen position (like mouse_position()) to room position
+    if view is None:
+        return (x, y)
+    return view.to_world(x, y)
+
+def view_to_screen(x, y):
+    if view is None:
+        return (x, y)
+    return view.to_screen(x, y)
+
+def instances_active():
+    #Instances to step: all of them, or the ones in the activation region
+    global instances_stepped
+    if view is None or view.activation is None:
+        if instances_stepped is None:
+            instances_stepped = [i for i in objects_group if instance_dispatched(i.__class__)]
+        return instances_stepped
+    found = [i for i in spatial_index.query(view.rect(view.activation), bulk=False)
+             if instance_dispatched(i.__class__)]
+    found.sort(key=lambda instance: instance.id)
+    return found
+
+
+#########################
+# Pathfinding Functions #
+#########################
+# Navigation grid of the current room, see odin/path.py. It is built
+# again (dropping the cached paths) only after instances of the solid
+# class come or go, or path_invalidate() is called.
+nav_grid = None
+nav_solid = None
+nav_dirty = False
+
+def path_grid(obj, cell_size=32, diagonal=False):
+    #Finds paths around the tiles and instances of obj in the room
+    global nav_grid, nav_solid, nav_dirty
+    width = getattr(current_room, 'width', 0)
+    height = getattr(current_room, 'height', 0)
+    for layer in current_room.tile_layers:
+        width = max(width, layer.x + layer.columns * layer.tile_size)
+        height = max(height, layer.y + layer.rows * layer.tile_size)
+    width = width or screen_size[0]
+    height = height or screen_size[1]
+    nav_grid = NavGrid(-(-width // cell_size), -(-height // cell_size), cell_size, diagonal)
+    nav_solid = obj
+    nav_dirty = True
+    return nav_grid
+
+def path_invalidate():
+    #Call after moving solid instances
+    global nav_dirty
+    nav_dirty = True
+
+def path_nav():
+    global nav_dirty
+    if nav_grid is None:
+        # Each room starts without one, there is no default solid class.
+        raise RuntimeError("no navigation grid in this room, call path_grid(obj) "
+                           "before path_find() or path_next()")
+    if nav_dirty:
+        nav_grid.clear()
+        for layer in current_room.tile_layers:
+            size = layer.tile_size
+            for tile, x, y in layer.tiles_in((layer.x, layer.y, layer.columns * size,
+                                              layer.rows * size), nav_solid):
+                nav_grid.mark((x, y, size, size))
+        for instance in instances_of(nav_solid):
+            nav_grid.mark(instance.mask)
+        nav_dirty = False
+    return nav_grid
+
+def path_point(target):
+    if isinstance(target, ObjectBase):
+        return target.mask.center
+    return target
+
+def path_find(start, goal):
+    #Returns the cell centers from start to goal (instances or points),
+    #[] when goal can not be reached
+    nav = path_nav()
+    x, y = path_point(start)
+    goal_x, goal_y = path_point(goal)
+    return [nav.center(cell) for cell in nav.find(nav.cell(x, y), nav.cell(goal_x, goal_y))]
+
+def path_next(start, goal):
+    #Returns the next cell center from start towards goal, the goal point
+    #once in its cell, None when it can not be reached. Every start going
+    #to the same goal cell shares one flow field.
+    nav = path_nav()
+    x, y = path_point(start)
+    goal_x, goal_y = path_point(goal)
+    cell = nav.cell(x, y)
+    target = nav.cell(goal_x, goal_y)
+    if cell < 0 or target < 0:
+        return None
+    if cell == target:
+        return (goal_x, goal_y)
+    following = nav.flow(target)[cell]
+    if following == -1:
+        return None
+    return nav.center(following)
+
+def path_stats():
+    nav = nav_grid
+    if nav is None:
+        return {}
+    return {'searches': nav.searches, 'flow_builds': nav.flow_builds,
+            'paths': len(nav.paths), 'flows': len(nav.flows)}
 
 
 #####################
@@ -154,6 +1082,64 @@ def isPointInsideRect(x, y, rect):
     else:
         return False
 
+def collision_list(rect, obj=None, notme=None):
+    #Returns the instances (of class obj, if given) whose mask overlaps rect
+    return spatial_index.query(rect, obj, notme)
+
+def tile_position(x, y, obj=None):
+    #Returns whether a tile (of class obj) of the current room covers (x,y)
+    for layer in current_room.tile_layers:
+        tile = layer.tile(x, y)
+        if tile is not None and (obj is None or issubclass(tile, obj)):
+            return True
+    return False
+
+def tiles_meeting(rect, obj=None):
+    #Returns whether a tile (of class obj) of the current room overlaps rect
+    for layer in current_room.tile_layers:
+        if layer.meeting(rect, obj):
+            return True
+    return False
+
+def rect_meeting(rect, obj=None, notme=None):
+    #Returns whether rect overlaps a tile or an instance (of class obj)
+    if tiles_meeting(rect, obj):
+        return True
+    return len(spatial_index.query(rect, obj, notme)) > 0
+
+# Pixel perfect checks, rects first then the frame masks, see
+# odin/collision.py.
+precise_collider = PreciseCollider()
+
+def precise_collision_cache(size):
+    #Remember up to size mask overlap results (0 turns the cache off)
+    precise_collider.cache_size = size
+    precise_collider.results.clear()
+
+def collision_instances(self, obj=None):
+    #Returns the instances (of class obj) whose pixels touch self's
+    instances = precise_collider.instances
+    return [other for other in spatial_index.query(self.mask, obj, self)
+            if instances(self, other)]
+
+def instance_meeting(self, obj=None):
+    #Returns whether the pixels of self touch a tile or an instance (of class obj)
+    for layer in current_room.tile_layers:
+        if precise_collider.tiles(self, layer, obj):
+            return True
+    instances = precise_collider.instances
+    for other in spatial_index.query(self.mask, obj, self):
+        if instances(self, other):
+            return True
+    return False
+
+def precise_collision_stats():
+    collider = precise_collider
+    total = collider.hits + collider.misses
+    return {'hits': collider.hits, 'misses': collider.misses,
+            'size': len(collider.results), 'capacity': collider.cache_size,
+            'hit_rate': float(collider.hits) / total if total else 0.0}
+
 def distance_to_object(a, b):
     return math.sqrt((a.x-b.x)**2 + (a.y-b.y)**2)
 
@@ -161,18 +1147,26 @@ def distance_to_point(a, x, y):
     return math.sqrt((a.x-x)**2 + (a.y-y)**2)    
 
 
-def place_empty(x, y):
-    #Returns whether the instance placed at position (x,y) meets nobody
-    return True
-    objRect = pygame.Rect(x, y, 1, 1)
-    if objRect.collidepoint(x, y):
-        return False
-    return True
+def place_empty(x, y, obj=None):
+    #Returns whether the point (x,y) meets no tile or instance (of class obj)
+    return not place_meeting(x, y, obj)
 
-    #for other in objects_group:
-    #    if x > other.x-1 and x<other.x+32 and y> other.y-1 and y<other.y+32:
-    #        return False
-    #return True
+def place_meeting(x, y, obj=None):
+    #Returns whether the point (x,y) meets a tile or an instance (of class obj)
+    if tile_position(x, y, obj):
+        return True
+    return spatial_index.position(x, y, obj) is not None
+
+def instance_position(x, y, obj=None):
+    #Returns the instance (of class obj) at the point (x,y), or None
+    return spatial_index.position(x, y, obj)
+
+def collision_rectangle(x1, y1, x2, y2, obj=None, notme=None):
+    #Returns the first instance (of class obj) overlapping the rectangle, or None
+    found = spatial_index.query(pygame.Rect(x1, y1, x2 - x1, y2 - y1), obj, notme)
+    if found:
+        return found[0]
+    return None
 
 
 ##################
@@ -197,6 +1191,7 @@ def window_set_fullscreen(state):
 ##################
 
 def game_end():
+    replay_stop()
     pygame.quit()
     sys.exit()
 
@@ -204,27 +1199,383 @@ def game_end():
 # Game Loop      #
 ##################
 
-def start_game(start_room):
-    global current_room
-    current_room = start_room()
-    current_room.create_event()
-    for instance in objects_group:
-        instance.event_create()
-    while True:
+# Logic runs at LOGIC_FPS fixed steps per second whatever the drawing
+# rate (FPS, 0 for unlimited). When drawing falls behind, at most
+# MAX_FRAMESKIP steps are run before the next draw.
+LOGIC_FPS = 60
+MAX_FRAMESKIP = 5
+interpolation = False
+
+def game_set_speed(logic_fps=None, fps=None, max_frameskip=None):
+    global LOGIC_FPS, FPS, MAX_FRAMESKIP
+    if logic_fps is not None:
+        LOGIC_FPS = logic_fps
+    if fps is not None:
+        FPS = fps
+    if max_frameskip is not None:
+        MAX_FRAMESKIP = max_frameskip
+
+def draw_set_interpolation(state):
+    #Draws instances between their previous and current step positions
+    global interpolation
+    interpolation = state
+
+# Frame profiler: phase and per-class timings, shown over the game with
+# profiler_show_overlay() (PROFILER_KEY toggles it) or dumped per frame.
+profiler = FrameProfiler()
+profiling = False
+PROFILER_KEY = pygame.K_F3
+
+def profiler_enable(state):
+    global profiling
+    profiling = state
+    if not state:
+        profiler.overlay = False
+        profiler.close()
+
+def profiler_show_overlay(state):
+    if state:
+        profiler_enable(True)
+    profiler.overlay = state
+
+def profiler_dump(path):
+    #Writes the stats of every frame to path (.csv, or JSON lines)
+    profiler_enable(True)
+    profiler.dump(path)
+
+def profiler_draw():
+    global draw_color
+    color = draw_color
+    draw_color = (255, 255, 255)
+    y = 4
+    for line in profiler.lines(fps_clock.get_fps()):
+        draw_text(4, y, line)
+        y += 16
+    draw_color = color
+
+def game_events():
+    global input_frame
+    scripted = input_script is not None
+    for event in pygame.event.get():
+        if event.type == pygame.QUIT:
+            game_end()
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+            game_end()
+        if event.type == pygame.KEYDOWN and event.key == PROFILER_KEY and profiling:
+            profiler.overlay = not profiler.overlay
+        if replay_reader is not None:
+            continue
+        if not scripted or event.type not in KEY_EVENTS:
+            input_state.event(event)
+    if scripted and replay_reader is None:
+        if input_frame < len(input_script):
+            input_state.script(input_script[input_frame])
+        else:
+            input_state.script(())
+        input_frame += 1
+
+def game_step(times=None, classes=None):
+    #Runs one logic step of the current room. With times, adds the seconds
+    #spent in each phase to it, and per object class to classes
+    #(class -> [step, update, collision])
+    if replay_reader is not None:
+        replay_step_begin()
+    timed = times is not None
+    if timed:
+        start = timer()
+    scheduler.tick()
+    batch_step()
+    if particle_system is not None:
+        particle_system.step()
+    if timed:
+        times['step'] += timer() - start
+    generation = room_generation
+    for instance in instances_active():
+        if room_generation != generation:
+            break
+        if instance.destroyed:
+            continue
+        if timed:
+            stats = None
+            if classes is not None:
+                stats = classes.get(instance.__class__)
+                if stats is None:
+                    stats = classes[instance.__class__] = [0.0, 0.0, 0.0, 0]
+            start = timer()
+        if not instance.batched:
+            instance.xprevious = instance.x
+            instance.yprevious = instance.y
+        instance.event_step()
+        if timed:
+            stepped = timer()
+            times['step'] += stepped - start
+        if instance.destroyed or room_generation != generation:
+            continue
+        instance.event_update()
+        if timed:
+            updated = timer()
+            times['update'] += updated - stepped
+        instance.event_collision()
+        if timed:
+            collided = timer()
+            times['collision'] += collided - updated
+            if stats is not None:
+                stats[0] += stepped - start
+                stats[1] += updated - stepped
+                stats[2] += collided - updated
+    if timed:
+        start = timer()
+    instance_cleanup()
+    if view is not None:
+        view.update(getattr(current_room, 'width', 0), getattr(current_room, 'height', 0))
+    if timed:
+        times['step'] += timer() - start
+    if replay_writer is not None or replay_reader is not None:
+        replay_step_end()
+    input_state.stepped()
+
+def game_draw(alpha=1.0):
+    #Draws a frame, alpha is how far we are between the last two steps.
+    #Returns the rects to push to the display, None for all of it.
+    overlay = profiler_draw if profiler.overlay else None
+    if view is not None:
+        # The view moves, the whole screen is drawn again.
+        draw_origin[:] = (view.x, view.y)
         current_room.event_draw()
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                game_end()
-            if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
-                game_end()
-            global key_check
-            key_check = pygame.key.get_pressed()
-
-        for instance in objects_group:
-            instance.event_step()
-            instance.event_update()
-            instance.event_collision()
-            instance.event_draw()
+        instances = draw_queue.visible(spatial_index.query(view.rect(view.margin), bulk=False))
+        draw_queue.draw(screen, alpha if interpolation else 1.0, instances, draw_origin)
+        if particle_system is not None:
+            particle_system.draw(screen, draw_origin)
+        draw_origin[:] = (0, 0)
+        if overlay is not None:
+            overlay()
+        return None
+    particles = particle_system is not None and particle_system.count > 0
+    if dirty_rendering:
+        if not particles and not draw_queue.bulk_rows():
+            return dirty_renderer.frame(screen, current_room, overlay)
+        # Particles and bulk drawn batches are everywhere, the whole
+        # screen is drawn again.
+        dirty_renderer.invalidate()
+    current_room.event_draw()
+    draw_queue.draw(screen, alpha if interpolation else 1.0)
+    if particles:
+        particle_system.draw(screen)
+    if overlay is not None:
+        overlay()
+    return None
 
+def game_flip(rects=None):
+    if rects is None:
         pygame.display.flip()
-        fps_clock.tick(FPS)
\ No newline at end of file
+    elif rects:
+        pygame.display.update(rects)
+
+def run_frames(room, frames, keys=None, draw=True):
+    #Runs room for the given number of frames without waiting and returns
+    #the seconds each frame spent in step, update, collision and draw.
+    #keys is an optional input script, one iterable of keys per frame.
+    input_set_script(keys if keys is not None else [])
+    change_room(room)
+    results = []
+    for frame in range(frames):
+        times = {'step': 0.0, 'update': 0.0, 'collision': 0.0, 'draw': 0.0}
+        game_events()
+        game_step(times)
+        if draw:
+            start = timer()
+            game_flip(game_draw())
+            times['draw'] = timer() - start
+        results.append(times)
+    return results
+
+def timings_report(results):
+    #Mean and worst milliseconds per phase of run_frames() results
+    lines = ["%-10s %10s %10s" % ("phase", "mean ms", "max ms")]
+    for phase in ('step', 'update', 'collision', 'draw'):
+        values = [times[phase] * 1000.0 for times in results] or [0.0]
+        lines.append("%-10s %10.3f %10.3f" % (phase, sum(values) / len(values), max(values)))
+    return "\n".join(lines)
+
+def timings_dump(path, results):
+    #Writes run_frames() or replay_run() results to path as CSV, one row
+    #per frame (with the state hash of replay checkpoints)
+    with open(path, 'w') as dump_file:
+        writer = csv.writer(dump_file)
+        writer.writerow(('frame', 'step', 'update', 'collision', 'draw', 'hash', 'match'))
+        for frame, times in enumerate(results):
+            writer.writerow([frame] + ["%.6f" % times[phase] for phase in
+                                       ('step', 'update', 'collision', 'draw')]
+                            + [times.get('hash', ''), times.get('match', '')])
+
+####################
+# Replay Functions #
+####################
+# Recordings of the input of every logic step and of the random seed,
+# see odin/replay.py. Played back one step per frame, a recording gives
+# the same game, so a bug report becomes a repeatable (performance) run.
+# ODIN_RECORD=file records a session started with start_game, and
+# ODIN_REPLAY=file plays it back instead (ODIN_REPLAY_SPEED times the
+# recorded rate, as fast as it can by default, ODIN_REPLAY_TIMES=file.csv
+# for the timings of every frame).
+replay_writer = None
+replay_reader = None
+# Hash of the last replay checkpoint, and whether it matched the recording.
+replay_hash = None
+replay_match = None
+
+def game_state_hash():
+    #Returns a hash of the room, of its instances (class and position, in
+    #creation order) and of the particle count
+    digest = hashlib.sha1(current_room.__class__.__name__)
+    for instance in objects_group:
+        if not instance.destroyed:
+            digest.update("%s %r %r\n" % (instance.__class__.__name__,
+                                          float(instance.x), float(instance.y)))
+    digest.update(str(part_particles_count()))
+    return digest.digest()
+
+def replay_record(path, seed=None):
+    #Records the input of every following logic step to path, seeding
+    #random with seed (a new one if None). Call it before start_game or
+    #change_room, so the room starts from the seed too.
+    global replay_writer
+    replay_stop()
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(32)
+    random.seed(seed)
+    replay_writer = ReplayWriter(path, seed, LOGIC_FPS)
+    return seed
+
+def replay_load(path):
+    #Plays path back from the next logic step on: its input replaces the
+    #keyboard and mouse, random gets the recorded seed
+    global replay_reader, replay_hash, replay_match
+    replay_stop()
+    replay_reader = ReplayReader(path)
+    random.seed(replay_reader.seed)
+    game_set_speed(logic_fps=replay_reader.logic_fps)
+    input_state.clear()
+    replay_hash = replay_match = None
+    return replay_reader
+
+def replay_stop():
+    global replay_writer, replay_reader
+    if replay_writer is not None:
+        replay_writer.close()
+    replay_writer = None
+    replay_reader = None
+
+def replay_step_begin():
+    global replay_hash, replay_match
+    replay_hash = replay_match = None
+    if replay_reader.done():
+        input_state.clear()
+        return
+    replay_hash = replay_reader.apply(input_state)
+
+def replay_step_end():
+    global replay_hash, replay_match
+    if replay_writer is not None:
+        digest = None
+        if (replay_writer.steps + 1) % CHECKPOINT == 0:
+            digest = game_state_hash()
+        replay_writer.step(input_state, digest)
+    elif replay_hash is not None:
+        expected = replay_hash
+        replay_hash = game_state_hash()[:len(expected)]
+        replay_match = replay_hash == expected
+
+def replay_run(room, path, speed=0.0, draw=True):
+    #Plays the recording path of room back, one logic step per frame, as
+    #fast as it can (speed 0) or at speed times the recorded rate. Returns
+    #the seconds each frame spent in step, update, collision and draw like
+    #run_frames(), plus the state 'hash' and whether it 'match'ed the
+    #recording at checkpoints.
+    reader = replay_load(path)
+    change_room(room)
+    results = []
+    try:
+        while not reader.done():
+            times = {'step': 0.0, 'update': 0.0, 'collision': 0.0, 'draw': 0.0}
+            game_events()
+            game_step(times)
+            if replay_match is not None:
+                times['hash'] = replay_hash.encode('hex')
+                times['match'] = replay_match
+            if draw:
+                start = timer()
+                game_flip(game_draw())
+                times['draw'] = timer() - start
+            results.append(times)
+            if speed > 0:
+                fps_clock.tick(reader.logic_fps * speed)
+    finally:
+        replay_stop()
+    return results
+
+def replay_report(results):
+    #Checkpoint lines of replay_run() results
+    lines = []
+    for frame, times in enumerate(results):
+        if 'hash' in times:
+            lines.append("step %6d  %s  %s" % (frame + 1, times['hash'],
+                                              "ok" if times['match'] else "DIVERGED"))
+    return "\n".join(lines)
+
+def start_game(start_room):
+    replay_path = os.environ.get('ODIN_REPLAY')
+    if replay_path:
+        results = replay_run(start_room, replay_path,
+                             float(os.environ.get('ODIN_REPLAY_SPEED', 0)))
+        print(timings_report(results))
+        print(replay_report(results))
+        if os.environ.get('ODIN_REPLAY_TIMES'):
+            timings_dump(os.environ['ODIN_REPLAY_TIMES'], results)
+        return
+    if os.environ.get('ODIN_RECORD'):
+        replay_record(os.environ['ODIN_RECORD'])
+    if HEADLESS:
+        try:
+            results = run_frames(start_room, int(os.environ.get('ODIN_FRAMES', 600)))
+        finally:
+            replay_stop()
+        print(timings_report(results))
+        return
+    room_start(start_room())
+    accumulator = 0.0
+    previous = timer()
+    while True:
+        step_time = 1.0 / LOGIC_FPS
+        now = timer()
+        accumulator += now - previous
+        previous = now
+        if profiling:
+            profiler.begin()
+            times = profiler.times
+            start = timer()
+        game_events()
+        if profiling:
+            times['events'] += timer() - start
+        steps = 0
+        while accumulator >= step_time and steps < MAX_FRAMESKIP:
+            if profiling:
+                game_step(times, profiler.classes)
+            else:
+                game_step()
+            accumulator -= step_time
+            steps += 1
+        if accumulator >= step_time:
+            # Too far behind, drop the backlog instead of spiralling.
+            accumulator %= step_time
+        if profiling:
+            start = timer()
+            rects = game_draw(accumulator / step_time)
+            drawn = timer()
+            game_flip(rects)
+            times['draw'] += drawn - start
+            times['flip'] += timer() - drawn
+            profiler.end(objects_group)
+        else:
+            game_flip(game_draw(accumulator / step_time))
+        fps_clock.tick(FPS)
@@ -0,0 +1,83 @@
+import heapq
+
+##########
+# Alarms #
+##########
+# Timers keyed on the logic step they are due, in a heap: a step only
+# looks at the timers that fire, however many are waiting. Entries are
+# [due, order, action, args, period, key] lists, cancelled ones keep
+# their place with no action until they come up.
+
+class Scheduler(object):
+    def __init__(self):
+        super(Scheduler, self).__init__()
+        self.frame = 0
+        self.heap = []
+        self.order = 0
+        # key -> entry, for timers that can be looked up (alarms).
+        self.keys = {}
+        self.dead = 0
+        self.fired = 0
+
+    def add(self, steps, action, args=(), period=0, key=None):
+        # Runs action(*args) in steps logic steps (at least one), then
+        # every period steps if period is given.
+        if key is not None:
+            self.cancel(self.keys.get(key))
+        self.order += 1
+        entry = [self.frame + max(int(steps), 1), self.order, action, args, int(period), key]
+        heapq.heappush(self.heap, entry)
+        if key is not None:
+            self.keys[key] = entry
+        return entry
+
+    def cancel(self, entry):
+        if entry is None or entry[2] is None:
+            return
+        entry[2] = None
+        if entry[5] is not None and self.keys.get(entry[5]) is entry:
+            del self.keys[entry[5]]
+        self.dead += 1
+        if self.dead > 64 and self.dead * 2 > len(self.heap):
+            # Mostly cancelled timers (alarms set again every step).
+            self.heap[:] = [entry for entry in self.heap if entry[2] is not None]
+            heapq.heapify(self.heap)
+            self.dead = 0
+
+    def remaining(self, key):
+        # Steps until the timer under key fires, -1 if there is none.
+        entry = self.keys.get(key)
+        if entry is None:
+            return -1
+        return entry[0] - self.frame
+
+    def tick(self):
+        # Advances one logic step and runs the timers now due.
+        self.frame += 1
+        frame = self.frame
+        heap = self.heap
+        while heap and heap[0][0] <= frame:
+            entry = heapq.heappop(heap)
+            action = entry[2]
+            if action is None:
+                self.dead -= 1
+                continue
+            if entry[4] > 0:
+                entry[0] = frame + entry[4]
+                heapq.heappush(heap, entry)
+            else:
+                entry[2] = None
+                if entry[5] is not None and self.keys.get(entry[5]) is entry:
+                    del self.keys[entry[5]]
+            self.fired += 1
+            action(*entry[3])
+
+    def clear(self):
+        for entry in self.heap:
+            entry[2] = None
+        del self.heap[:]
+        self.keys.clear()
+        self.dead = 0
+
+    def pending(self):
+        return len(self.heap) - self.dead
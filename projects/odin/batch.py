@@ -0,0 +1,131 @@
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+##########################
+# Batched (NumPy) motion #
+##########################
+# Instances of a batched class keep their position and speed in NumPy
+# columns owned by a Batch, so moving all of them is one array operation
+# instead of one Python call per instance.
+
+COLUMNS = ('x', 'y', 'xprevious', 'yprevious', 'hspeed', 'vspeed')
+CELLS = ('cell_left', 'cell_top', 'cell_right', 'cell_bottom')
+
+class Batch(object):
+    def __init__(self, kind, capacity=256):
+        super(Batch, self).__init__()
+        if numpy is None:
+            raise ImportError("batched objects need numpy")
+        self.kind = kind
+        self.count = 0
+        # Bumped when compact() moves or drops rows.
+        self.version = 0
+        self.instances = []
+        for name in COLUMNS:
+            setattr(self, name, numpy.zeros(capacity))
+        self.mask_width = numpy.zeros(capacity, dtype=numpy.int64)
+        self.mask_height = numpy.zeros(capacity, dtype=numpy.int64)
+        # Cells each mask was last filed under in the spatial index.
+        for name in CELLS:
+            setattr(self, name, numpy.zeros(capacity, dtype=numpy.int64))
+        self.alive = numpy.zeros(capacity, dtype=bool)
+
+    def grow(self):
+        for name in COLUMNS + CELLS + ('mask_width', 'mask_height', 'alive'):
+            column = getattr(self, name)
+            setattr(self, name, numpy.concatenate((column, numpy.zeros_like(column))))
+
+    def add(self, instance):
+        if self.count == len(self.alive):
+            self.grow()
+        index = self.count
+        self.count += 1
+        self.instances.append(instance)
+        self.alive[index] = True
+        # Impossible cells, so the first step files the instance again.
+        for name in CELLS:
+            getattr(self, name)[index] = -2**62
+        return index
+
+    def kill(self, index):
+        self.alive[index] = False
+
+    def compact(self):
+        # Swaps the dead rows with the last live ones, once per frame.
+        index = 0
+        while index < self.count:
+            if self.alive[index]:
+                index += 1
+                continue
+            last = self.count - 1
+            if index != last:
+                for name in COLUMNS + CELLS + ('mask_width', 'mask_height', 'alive'):
+                    column = getattr(self, name)
+                    column[index] = column[last]
+                moved = self.instances[last]
+                moved.index = index
+                self.instances[index] = moved
+            self.instances.pop()
+            self.count -= 1
+            self.version += 1
+
+    def copy(self):
+        # Same rows in new columns, the caller maps the instances.
+        batch = Batch.__new__(Batch)
+        batch.__dict__.update(self.__dict__)
+        for name in COLUMNS + CELLS + ('mask_width', 'mask_height', 'alive'):
+            setattr(batch, name, getattr(self, name).copy())
+        batch.instances = list(self.instances)
+        return batch
+
+    def advance(self):
+        n = self.count
+        x = self.x[:n]
+        y = self.y[:n]
+        self.xprevious[:n] = x
+        self.yprevious[:n] = y
+        x += self.hspeed[:n]
+        y += self.vspeed[:n]
+
+    def step(self, cell_size):
+        # Advances every row and returns the instances whose mask moved
+        # into other cells of the spatial index, with their new cells
+        # (left, top, right and bottom lists).
+        n = self.count
+        if n == 0:
+            return [], [], [], [], []
+        self.advance()
+        x = self.x[:n]
+        y = self.y[:n]
+        left = numpy.trunc(x).astype(numpy.int64)
+        top = numpy.trunc(y).astype(numpy.int64)
+        cells = (left // cell_size,
+                 top // cell_size,
+                 (left + numpy.maximum(self.mask_width[:n], 1) - 1) // cell_size,
+                 (top + numpy.maximum(self.mask_height[:n], 1) - 1) // cell_size)
+        moved = numpy.zeros(n, dtype=bool)
+        for name, cell in zip(CELLS, cells):
+            column = getattr(self, name)
+            moved |= column[:n] != cell
+            column[:n] = cell
+        moved &= self.alive[:n]
+        rows = numpy.flatnonzero(moved)
+        instances = self.instances
+        return ([instances[i] for i in rows.tolist()],) + tuple(cell[rows].tolist() for cell in cells)
+
+
+class column(object):
+    # Attribute stored in the instance's row of its Batch.
+    def __init__(self, name):
+        super(column, self).__init__()
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return float(getattr(instance.batch, self.name)[instance.index])
+
+    def __set__(self, instance, value):
+        getattr(instance.batch, self.name)[instance.index] = value
@@ -0,0 +1,73 @@
+import pygame
+from sprite import Sprite
+
+#######################
+# Precise collisions #
+#######################
+# Pixel perfect tests between instances (and tiles). The rects are
+# compared first, only overlapping pairs get their pixel masks compared.
+# With a cache_size the answers are also remembered per pair of frame
+# masks and offset, which only pays off for big masks: a pygame 2
+# Mask.overlap of small sprites costs about as much as the lookup.
+
+class PreciseCollider(object):
+    def __init__(self, cache_size=0):
+        super(PreciseCollider, self).__init__()
+        self.cache_size = cache_size
+        self.results = {}
+        self.surface_masks = {}
+        self.hits = 0
+        self.misses = 0
+
+    def image_mask(self, sprite, index=0):
+        # Mask of the whole frame, None when the sprite has no pixels to
+        # look at (the rect is all there is).
+        if sprite is None:
+            return None
+        if sprite.__class__ is Sprite:
+            return sprite.mask(index)
+        mask = self.surface_masks.get(sprite)
+        if mask is None:
+            mask = self.surface_masks[sprite] = pygame.mask.from_surface(sprite)
+        return mask
+
+    def overlap(self, mask, x, y, other_mask, other_x, other_y):
+        if mask is None or other_mask is None:
+            return True
+        dx = int(other_x) - int(x)
+        dy = int(other_y) - int(y)
+        if not self.cache_size:
+            return mask.overlap(other_mask, (dx, dy)) is not None
+        key = (mask, other_mask, dx, dy)
+        result = self.results.get(key)
+        if result is None:
+            self.misses += 1
+            result = mask.overlap(other_mask, (dx, dy)) is not None
+            if len(self.results) >= self.cache_size:
+                self.results.clear()
+            self.results[key] = result
+        else:
+            self.hits += 1
+        return result
+
+    def instances(self, instance, other):
+        # Whether two instances touch, rects first.
+        if not instance.mask.colliderect(other.mask):
+            return False
+        return self.overlap(self.image_mask(instance.sprite_index, instance.image_index),
+                            instance.x, instance.y,
+                            self.image_mask(other.sprite_index, other.image_index),
+                            other.x, other.y)
+
+    def tiles(self, instance, layer, obj=None):
+        # Whether the instance touches a tile (of class obj) of the layer.
+        mask = self.image_mask(instance.sprite_index, instance.image_index)
+        for tile, x, y in layer.tiles_in(instance.mask, obj):
+            if self.overlap(mask, instance.x, instance.y,
+                            self.image_mask(tile.sprite_index), x, y):
+                return True
+        return False
+
+    def clear(self):
+        self.results.clear()
+        self.surface_masks.clear()
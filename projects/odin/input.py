@@ -0,0 +1,64 @@
+import pygame
+
+#########
+# Input #
+#########
+# Keyboard and mouse state kept up to date from the event queue (or from
+# an input script), so checks are set lookups and stay right on frames
+# without events. Presses and releases are remembered until the next
+# logic step has seen them.
+
+KEY_EVENTS = (pygame.KEYDOWN, pygame.KEYUP)
+
+class InputState(object):
+    def __init__(self):
+        super(InputState, self).__init__()
+        self.keys = set()
+        self.keys_pressed = set()
+        self.keys_released = set()
+        self.buttons = set()
+        self.buttons_pressed = set()
+        self.buttons_released = set()
+        self.mouse = (0, 0)
+
+    def event(self, event):
+        kind = event.type
+        if kind == pygame.KEYDOWN:
+            self.keys.add(event.key)
+            self.keys_pressed.add(event.key)
+        elif kind == pygame.KEYUP:
+            self.keys.discard(event.key)
+            self.keys_released.add(event.key)
+        elif kind == pygame.MOUSEMOTION:
+            self.mouse = event.pos
+        elif kind == pygame.MOUSEBUTTONDOWN:
+            self.mouse = event.pos
+            self.buttons.add(event.button)
+            self.buttons_pressed.add(event.button)
+        elif kind == pygame.MOUSEBUTTONUP:
+            self.mouse = event.pos
+            self.buttons.discard(event.button)
+            self.buttons_released.add(event.button)
+        elif kind == pygame.ACTIVEEVENT and not event.gain and event.state & 2:
+            # Lost the keyboard focus, its key ups will never come.
+            self.keys_released |= self.keys
+            self.keys.clear()
+
+    def script(self, keys):
+        # Holds exactly keys this frame, as if they were typed.
+        keys = set(keys)
+        self.keys_pressed |= keys - self.keys
+        self.keys_released |= self.keys - keys
+        self.keys = keys
+
+    def stepped(self):
+        # A logic step has seen the presses and releases.
+        self.keys_pressed.clear()
+        self.keys_released.clear()
+        self.buttons_pressed.clear()
+        self.buttons_released.clear()
+
+    def clear(self):
+        self.keys.clear()
+        self.buttons.clear()
+        self.stepped()
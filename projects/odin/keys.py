@@ -6,7 +6,26 @@ vk_up = pygame.K_UP
 vk_down = pygame.K_DOWN
 vk_enter = pygame.K_RETURN
 vk_escape = pygame.K_ESCAPE
+vk_space = pygame.K_SPACE
+vk_shift = pygame.K_LSHIFT
+vk_control = pygame.K_LCTRL
+vk_alt = pygame.K_LALT
+vk_backspace = pygame.K_BACKSPACE
+vk_tab = pygame.K_TAB
+
+mb_left = 1
+mb_middle = 2
+mb_right = 3
+
+# Key code by name: "w", "1", "space", "left"... (pygame's K_ names).
+key_codes = dict((name[2:].lower(), getattr(pygame, name))
+                 for name in dir(pygame) if name.startswith('K_'))
+char_code = ord
 
 def ord(key):
-    if key == "w":
-       pygame.K_w
\ No newline at end of file
+    # Key code of a character or key name, like GameMaker's ord("W").
+    code = key_codes.get(key.lower())
+    if code is None and len(key) == 1:
+        # Printable characters are their own key code (",", "/"...).
+        return char_code(key)
+    return code
@@ -0,0 +1,160 @@
+import pygame
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+#############
+# Particles #
+#############
+# Particles are rows of preallocated NumPy columns, not instances: every
+# step moves, ages and compacts all of them with a few array operations
+# (the dead rows are overwritten by the live ones, so their slots are
+# reused), and they are drawn as squares written straight into the
+# surface pixels, one array assignment per type and pixel of size.
+
+COLUMNS = ('x', 'y', 'hspeed', 'vspeed', 'gravity', 'life')
+
+class ParticleType(object):
+    def __init__(self, color=(255, 255, 255), size=2, life=(30, 60), speed=(1.0, 3.0),
+                 direction=(0.0, 360.0), gravity=0.0):
+        super(ParticleType, self).__init__()
+        # life, speed and direction (degrees, 90 is up) are (low, high)
+        # ranges each particle is given a random value in.
+        self.color = color
+        self.size = size
+        self.life = life
+        self.speed = speed
+        self.direction = direction
+        self.gravity = gravity
+
+class Emitter(object):
+    def __init__(self, rect, kind, rate):
+        super(Emitter, self).__init__()
+        # rate particles per step (fractions add up) anywhere in rect.
+        self.rect = pygame.Rect(rect)
+        self.kind = kind
+        self.rate = rate
+        self.owed = 0.0
+
+class ParticleSystem(object):
+    def __init__(self, capacity=4096, seed=None):
+        super(ParticleSystem, self).__init__()
+        if numpy is None:
+            raise ImportError("particles need numpy")
+        self.count = 0
+        for name in COLUMNS:
+            setattr(self, name, numpy.zeros(capacity))
+        self.kind = numpy.zeros(capacity, dtype=numpy.int32)
+        # Particle types, and their row in it.
+        self.types = []
+        self.indexes = {}
+        self.emitters = []
+        self.random = numpy.random.RandomState(seed)
+
+    def grow(self, needed):
+        capacity = len(self.x)
+        while capacity < needed:
+            capacity *= 2
+        for name in COLUMNS + ('kind',):
+            column = getattr(self, name)
+            grown = numpy.zeros(capacity, dtype=column.dtype)
+            grown[:self.count] = column[:self.count]
+            setattr(self, name, grown)
+
+    def register(self, kind):
+        index = self.indexes.get(kind)
+        if index is None:
+            index = self.indexes[kind] = len(self.types)
+            self.types.append(kind)
+        return index
+
+    def emit(self, kind, x, y, number, width=0, height=0):
+        # number particles of kind at (x, y), or anywhere in the rect.
+        number = int(number)
+        if number <= 0:
+            return
+        start = self.count
+        end = start + number
+        if end > len(self.x):
+            self.grow(end)
+        random = self.random
+        rows = slice(start, end)
+        self.x[rows] = x
+        self.y[rows] = y
+        if width:
+            self.x[rows] += random.uniform(0, width, number)
+        if height:
+            self.y[rows] += random.uniform(0, height, number)
+        speed = random.uniform(kind.speed[0], kind.speed[1], number)
+        direction = numpy.radians(random.uniform(kind.direction[0], kind.direction[1], number))
+        self.hspeed[rows] = numpy.cos(direction) * speed
+        self.vspeed[rows] = -numpy.sin(direction) * speed
+        self.gravity[rows] = kind.gravity
+        self.life[rows] = random.randint(kind.life[0], kind.life[1] + 1, number)
+        self.kind[rows] = self.register(kind)
+        self.count = end
+
+    def step(self):
+        for emitter in self.emitters:
+            emitter.owed += emitter.rate
+            number = int(emitter.owed)
+            if number:
+                emitter.owed -= number
+                rect = emitter.rect
+                self.emit(emitter.kind, rect.x, rect.y, number, rect.width, rect.height)
+        n = self.count
+        if n == 0:
+            return
+        self.x[:n] += self.hspeed[:n]
+        self.y[:n] += self.vspeed[:n]
+        self.vspeed[:n] += self.gravity[:n]
+        life = self.life[:n]
+        life -= 1
+        alive = life > 0
+        left = int(alive.sum())
+        if left < n:
+            # Live rows move to the front, over the dead ones.
+            for name in COLUMNS + ('kind',):
+                column = getattr(self, name)
+                column[:left] = column[:n][alive]
+            self.count = left
+
+    def draw(self, surface, origin=(0, 0)):
+        n = self.count
+        if n == 0:
+            return
+        if surface.get_bytesize() == 3:
+            self.draw_rects(surface, origin)
+            return
+        width, height = surface.get_size()
+        xs = (self.x[:n] - origin[0]).astype(numpy.int32)
+        ys = (self.y[:n] - origin[1]).astype(numpy.int32)
+        kinds = self.kind[:n]
+        pixels = pygame.surfarray.pixels2d(surface)
+        try:
+            for index, kind in enumerate(self.types):
+                size = kind.size
+                shown = ((kinds == index) & (xs >= 0) & (ys >= 0)
+                         & (xs <= width - size) & (ys <= height - size))
+                px = xs[shown]
+                py = ys[shown]
+                color = surface.map_rgb(kind.color)
+                for dx in range(size):
+                    for dy in range(size):
+                        pixels[px + dx, py + dy] = color
+        finally:
+            del pixels
+
+    def draw_rects(self, surface, origin=(0, 0)):
+        # Surfaces without a pixel array view (24 bits), one fill each.
+        left, top = origin
+        types = self.types
+        for index in range(self.count):
+            kind = types[self.kind[index]]
+            surface.fill(kind.color, (int(self.x[index] - left), int(self.y[index] - top),
+                                      kind.size, kind.size))
+
+    def clear(self):
+        self.count = 0
+        del self.emitters[:]
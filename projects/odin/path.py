@@ -0,0 +1,175 @@
+import heapq
+
+###############
+# Pathfinding #
+###############
+# A grid of solid cells built from the room's solids. Single paths are
+# found with A*, and many agents heading to the same cell share one flow
+# field (every cell pointing at its next cell towards the goal). Paths
+# and fields are cached until the solids change.
+
+STRAIGHT = ((1, 0, 1.0), (-1, 0, 1.0), (0, 1, 1.0), (0, -1, 1.0))
+DIAGONAL = STRAIGHT + ((1, 1, 1.4142135623730951), (-1, 1, 1.4142135623730951),
+                       (1, -1, 1.4142135623730951), (-1, -1, 1.4142135623730951))
+
+class NavGrid(object):
+    def __init__(self, columns, rows, cell_size=32, diagonal=False, cache_size=1024):
+        super(NavGrid, self).__init__()
+        self.columns = columns
+        self.rows = rows
+        self.cell_size = cell_size
+        self.diagonal = diagonal
+        self.moves = DIAGONAL if diagonal else STRAIGHT
+        self.solid = bytearray(columns * rows)
+        self.cache_size = cache_size
+        # (start, goal) -> cells, goal -> next cell of every cell.
+        self.paths = {}
+        self.flows = {}
+        self.searches = 0
+        self.flow_builds = 0
+
+    def clear(self):
+        self.solid = bytearray(self.columns * self.rows)
+        self.paths.clear()
+        self.flows.clear()
+
+    def mark(self, rect):
+        # Makes the cells overlapped by rect solid.
+        if rect[2] <= 0 or rect[3] <= 0:
+            return
+        size = self.cell_size
+        left = max(int(rect[0] // size), 0)
+        top = max(int(rect[1] // size), 0)
+        right = min(int((rect[0] + rect[2] - 1) // size), self.columns - 1)
+        bottom = min(int((rect[1] + rect[3] - 1) // size), self.rows - 1)
+        solid = self.solid
+        columns = self.columns
+        for row in range(top, bottom + 1):
+            for column in range(left, right + 1):
+                solid[row * columns + column] = 1
+
+    def cell(self, x, y):
+        # Index of the cell under (x, y), -1 outside of the grid.
+        column = int(x // self.cell_size)
+        row = int(y // self.cell_size)
+        if 0 <= column < self.columns and 0 <= row < self.rows:
+            return row * self.columns + column
+        return -1
+
+    def center(self, index):
+        size = self.cell_size
+        row, column = divmod(index, self.columns)
+        return (column * size + size // 2, row * size + size // 2)
+
+    def neighbours(self, index):
+        # (cell, cost) of the free cells one move away, diagonals do not
+        # cut the corners of solid cells.
+        columns = self.columns
+        rows = self.rows
+        solid = self.solid
+        row, column = divmod(index, columns)
+        found = []
+        for dx, dy, cost in self.moves:
+            x = column + dx
+            y = row + dy
+            if x < 0 or y < 0 or x >= columns or y >= rows or solid[y * columns + x]:
+                continue
+            if dx and dy and (solid[row * columns + x] or solid[y * columns + column]):
+                continue
+            found.append((y * columns + x, cost))
+        return found
+
+    def heuristic(self, index, goal):
+        row, column = divmod(index, self.columns)
+        goal_row, goal_column = divmod(goal, self.columns)
+        dx = abs(column - goal_column)
+        dy = abs(row - goal_row)
+        if self.diagonal:
+            return max(dx, dy) + 0.41421356237309515 * min(dx, dy)
+        return dx + dy
+
+    def find(self, start, goal):
+        # Cells from start to goal (both included), [] when there is no
+        # way. A goal with a flow field is read from it.
+        if start < 0 or goal < 0 or self.solid[start] or self.solid[goal]:
+            return []
+        key = (start, goal)
+        path = self.paths.get(key)
+        if path is not None:
+            return path
+        field = self.flows.get(goal)
+        if field is not None:
+            path = self.follow(field, start, goal)
+        else:
+            path = self.search(start, goal)
+        if len(self.paths) >= self.cache_size:
+            self.paths.clear()
+        self.paths[key] = path
+        return path
+
+    def search(self, start, goal):
+        # A* over the free cells with a binary heap.
+        self.searches += 1
+        came = {start: -1}
+        cost = {start: 0.0}
+        heap = [(self.heuristic(start, goal), 0, 0.0, start)]
+        order = 0
+        while heap:
+            estimate, ignored, base, index = heapq.heappop(heap)
+            if base > cost[index]:
+                continue
+            if index == goal:
+                path = []
+                while index != -1:
+                    path.append(index)
+                    index = came[index]
+                path.reverse()
+                return path
+            for neighbour, step in self.neighbours(index):
+                total = base + step
+                if total < cost.get(neighbour, total + 1.0):
+                    cost[neighbour] = total
+                    came[neighbour] = index
+                    order += 1
+                    heapq.heappush(heap, (total + self.heuristic(neighbour, goal), order,
+                                          total, neighbour))
+        return []
+
+    def flow(self, goal):
+        # Next cell towards goal for every cell, -1 where goal can not be
+        # reached (and at the goal itself).
+        field = self.flows.get(goal)
+        if field is not None:
+            return field
+        self.flow_builds += 1
+        field = [-1] * (self.columns * self.rows)
+        if goal >= 0 and not self.solid[goal]:
+            cost = {goal: 0.0}
+            heap = [(0.0, goal)]
+            while heap:
+                base, index = heapq.heappop(heap)
+                if base > cost[index]:
+                    continue
+                # Moves are symmetric, so a cell reached from index goes
+                # back through it.
+                for neighbour, step in self.neighbours(index):
+                    total = base + step
+                    if total < cost.get(neighbour, total + 1.0):
+                        cost[neighbour] = total
+                        field[neighbour] = index
+                        heapq.heappush(heap, (total, neighbour))
+        if len(self.flows) >= 64:
+            self.flows.clear()
+        self.flows[goal] = field
+        return field
+
+    def follow(self, field, start, goal):
+        # Cells from start to goal along a flow field.
+        if start != goal and field[start] == -1:
+            return []
+        path = [start]
+        index = field[start]
+        while index != -1:
+            path.append(index)
+            index = field[index]
+        return path
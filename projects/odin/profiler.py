@@ -0,0 +1,94 @@
+import csv
+import json
+
+##################
+# Frame profiler #
+##################
+# Seconds spent in each phase of a frame, and per object class in the
+# instance events, for the overlay and for per-frame stat dumps.
+
+PHASES = ('events', 'step', 'update', 'collision', 'draw', 'flip')
+
+class FrameProfiler(object):
+    def __init__(self):
+        super(FrameProfiler, self).__init__()
+        self.frame = 0
+        self.overlay = False
+        self.times = dict.fromkeys(PHASES, 0.0)
+        # class -> [step, update, collision, instances]
+        self.classes = {}
+        self.last_times = dict(self.times)
+        self.last_classes = {}
+        self.file = None
+        self.writer = None
+
+    def begin(self):
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self.classes = {}
+
+    def end(self, instances):
+        # Every class with live instances is counted, stepped or not
+        # (simple batched, idle, out of the activation region).
+        stepped = bool(self.classes)
+        for stats in self.classes.values():
+            stats[3] = 0
+        for instance in instances:
+            if instance.destroyed:
+                continue
+            stats = self.classes.get(instance.__class__)
+            if stats is None:
+                stats = self.classes[instance.__class__] = [0.0, 0.0, 0.0, 0]
+            stats[3] += 1
+        self.last_times = self.times
+        if stepped:
+            # Frames without a logic step keep showing the last one.
+            self.last_classes = self.classes
+        if self.file is not None:
+            self.write()
+        self.frame += 1
+
+    def dump(self, path):
+        # Stats of every following frame go to path: CSV for a .csv file
+        # (phases only), JSON lines with per-class stats otherwise.
+        self.close()
+        self.file = open(path, 'w')
+        if path.endswith('.csv'):
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(('frame',) + PHASES + ('instances',))
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+        self.file = None
+        self.writer = None
+
+    def write(self):
+        times = self.times
+        instances = sum(stats[3] for stats in self.classes.values())
+        if self.writer is not None:
+            self.writer.writerow([self.frame] + ["%.6f" % times[phase] for phase in PHASES]
+                                 + [instances])
+            return
+        classes = {}
+        for cls, stats in self.classes.items():
+            classes[cls.__name__] = {'step': stats[0], 'update': stats[1],
+                                     'collision': stats[2], 'instances': stats[3]}
+        record = dict(times)
+        record['frame'] = self.frame
+        record['instances'] = instances
+        record['classes'] = classes
+        self.file.write(json.dumps(record, sort_keys=True) + "\n")
+
+    def lines(self, fps):
+        # Overlay text: the frame's phases, then the costliest classes.
+        times = self.last_times
+        total = sum(times.values())
+        lines = ["%.1f fps  %.2f ms" % (fps, total * 1000.0)]
+        for phase in PHASES:
+            lines.append("%-10s %6.2f ms" % (phase, times[phase] * 1000.0))
+        ranked = sorted(self.last_classes.items(),
+                        key=lambda item: -(item[1][0] + item[1][1] + item[1][2]))
+        for cls, stats in ranked[:8]:
+            lines.append("%-16s %5d %6.2f ms" % (cls.__name__[:16], stats[3],
+                                                 (stats[0] + stats[1] + stats[2]) * 1000.0))
+        return lines
@@ -0,0 +1,326 @@
+import pygame
+from itertools import izip, repeat
+from sprite import Sprite, sprite_image
+
+##############
+# Draw queue #
+##############
+# Instances in draw order: higher depth first, creation order for equal
+# depths. The order is only sorted again when instances come and go or a
+# depth changes, and each run of equal depth is one Surface.blits call.
+# Simple batched classes drawn the stock way are not in the order: each
+# is one blits fed from its columns, after the instances of its depth.
+
+def draw_key(instance):
+    return (-instance.depth, instance.id)
+
+class DrawQueue(object):
+    def __init__(self, default_event_draw):
+        super(DrawQueue, self).__init__()
+        self.default_event_draw = default_event_draw
+        self.default_draw = {}
+        self.order = []
+        self.depths = []
+        self.added = []
+        self.removed = False
+        # Instances with their own event_draw, drawn even out of view.
+        self.custom = []
+        # Batches drawn in bulk, in creation order.
+        self.batches = []
+        self.bulk_draw = {}
+
+    def plain(self, instance):
+        # Whether the instance draws with the stock event_draw, so it can
+        # be batched (and its rect known without drawing it).
+        cls = instance.__class__
+        plain = self.default_draw.get(cls)
+        if plain is None:
+            method = cls.event_draw
+            plain = getattr(method, '__func__', method) is self.default_event_draw
+            self.default_draw[cls] = plain
+        return plain
+
+    def bulk(self, cls):
+        # Whether all the instances of cls are drawn from their batch: a
+        # simple batched class with the stock event_draw, and one sprite
+        # frame, depth and visibility for all of them.
+        bulk = self.bulk_draw.get(cls)
+        if bulk is None:
+            sprite = cls.sprite_index
+            method = cls.event_draw
+            bulk = (cls.batched and cls.simple
+                    and getattr(method, '__func__', method) is self.default_event_draw
+                    and cls.depth.__class__ in (int, float) and cls.visible in (True, False)
+                    and not (sprite.__class__ is Sprite and sprite.count > 1))
+            self.bulk_draw[cls] = bulk
+        return bulk
+
+    def bulk_rows(self):
+        return sum(batch.count for batch in self.batches)
+
+    def add(self, instance):
+        if self.bulk(instance.__class__):
+            if instance.batch not in self.batches:
+                self.batches.append(instance.batch)
+            return
+        self.added.append(instance)
+        if not self.plain(instance):
+            self.custom.append(instance)
+
+    def remove(self):
+        # The pending lists are pruned every cleanup, nothing else does it
+        # when frames are not drawn (or only through a view). The order is
+        # pruned the next time it is sorted.
+        self.added = [i for i in self.added if not i.destroyed]
+        self.custom = [i for i in self.custom if not i.destroyed]
+        self.removed = True
+
+    def compact(self):
+        # Drops the destroyed instances right away, before they can be
+        # recycled (and not destroyed anymore) by an instance pool.
+        kept = [(i, depth) for i, depth in zip(self.order, self.depths) if not i.destroyed]
+        self.order = [i for i, depth in kept]
+        self.depths = [depth for i, depth in kept]
+        self.added = [i for i in self.added if not i.destroyed]
+        self.custom = [i for i in self.custom if not i.destroyed]
+        self.removed = False
+
+    def clear(self):
+        self.order = []
+        self.depths = []
+        del self.added[:]
+        del self.custom[:]
+        del self.batches[:]
+        self.removed = False
+
+    def ordered(self):
+        order = self.order
+        resort = self.removed or self.added
+        if not resort:
+            depths = self.depths
+            for index in range(len(order)):
+                if order[index].depth != depths[index]:
+                    resort = True
+                    break
+        if resort:
+            if self.removed:
+                order = [i for i in order if not i.destroyed]
+                self.custom = [i for i in self.custom if not i.destroyed]
+            order.extend([i for i in self.added if not i.destroyed])
+            # Cheap on the nearly sorted previous order.
+            order.sort(key=draw_key)
+            self.order = order
+            self.depths = [i.depth for i in order]
+            del self.added[:]
+            self.removed = False
+        return order
+
+    def visible(self, found):
+        # found (the instances in view, from the spatial index) and the
+        # live ones with their own event_draw, in draw order.
+        instances = dict((i.id, i) for i in found)
+        for instance in self.custom:
+            if not instance.destroyed:
+                instances[instance.id] = instance
+        return sorted(instances.values(), key=draw_key)
+
+    def draw(self, surface, alpha=1.0, instances=None, origin=(0, 0)):
+        # alpha < 1 draws instances between xprevious/yprevious and x/y,
+        # origin is the world position of the top left of surface.
+        left, top = origin
+        bounds = surface.get_rect()
+        right = bounds.right
+        bottom = bounds.bottom
+        run = []
+        run_depth = None
+        if instances is None:
+            instances = self.ordered()
+        groups = [batch for batch in self.batches if batch.count]
+        groups.sort(key=lambda batch: -batch.kind.depth)
+        for instance in instances:
+            if groups and groups[0].kind.depth > instance.depth:
+                if run:
+                    blits(surface, run)
+                    run = []
+                while groups and groups[0].kind.depth > instance.depth:
+                    draw_rows(surface, groups.pop(0), alpha, left, top, right, bottom)
+            if instance.destroyed or not instance.visible:
+                continue
+            if not self.plain(instance):
+                if run:
+                    blits(surface, run)
+                    run = []
+                instance.event_draw()
+                continue
+            if instance.depth != run_depth:
+                if run:
+                    blits(surface, run)
+                    run = []
+                run_depth = instance.depth
+            sprite = instance.sprite_index
+            if sprite is None:
+                continue
+            image = sprite_image(sprite, instance.image_index)
+            x = instance.x
+            y = instance.y
+            if alpha != 1.0:
+                x = instance.xprevious + (x - instance.xprevious) * alpha
+                y = instance.yprevious + (y - instance.yprevious) * alpha
+            x -= left
+            y -= top
+            width, height = image.get_size()
+            if x >= right or y >= bottom or x + width <= 0 or y + height <= 0:
+                continue
+            run.append((image, (x, y)))
+        if run:
+            blits(surface, run)
+        for batch in groups:
+            draw_rows(surface, batch, alpha, left, top, right, bottom)
+
+def draw_rows(surface, batch, alpha, left, top, right, bottom):
+    # The live rows of a bulk drawn batch inside the surface, one blits.
+    cls = batch.kind
+    sprite = cls.sprite_index
+    if sprite is None or not cls.visible:
+        return
+    image = sprite_image(sprite, 0)
+    width, height = image.get_size()
+    n = batch.count
+    x = batch.x[:n]
+    y = batch.y[:n]
+    if alpha != 1.0:
+        x = batch.xprevious[:n] + (x - batch.xprevious[:n]) * alpha
+        y = batch.yprevious[:n] + (y - batch.yprevious[:n]) * alpha
+    x = x - left
+    y = y - top
+    shown = batch.alive[:n] & (x < right) & (y < bottom) & (x + width > 0) & (y + height > 0)
+    # Lazy pairs, the tuples are reused from one blit to the next.
+    blits(surface, izip(repeat(image), izip(x[shown].tolist(), y[shown].tolist())))
+
+def blits(surface, sequence):
+    # Surface.blits is pygame 1.9.4+.
+    if hasattr(surface, 'blits'):
+        surface.blits(sequence, False)
+    else:
+        for sprite, position in sequence:
+            surface.blit(sprite, position)
+
+
+###########################
+# Dirty rectangle drawing #
+###########################
+# Keeps the room background in a surface and, every frame, only restores
+# and redraws the parts of the screen where instances moved, appeared or
+# disappeared, then pushes just those rects to the display.
+
+class DirtyRenderer(object):
+    def __init__(self, queue):
+        super(DirtyRenderer, self).__init__()
+        self.queue = queue
+        self.background = None
+        self.last = {}
+        self.keys = {}
+        # List the draw functions append their blit rects to, or None.
+        self.capture = None
+
+    def invalidate(self):
+        self.background = None
+
+    def reset(self, screen, room):
+        room.event_draw()
+        self.background = screen.copy()
+        self.last = {}
+        self.keys = {}
+        pygame.display.flip()
+
+    def frame(self, screen, room, overlay=None):
+        # Returns the rects that changed, overlay is drawn last and over
+        # everything, like an instance that moves every frame.
+        if self.background is None:
+            self.reset(screen, room)
+        instances = self.queue.ordered()
+        bounds = screen.get_rect()
+        last = self.last
+        keys = self.keys
+        current = {}
+        dirty = []
+        redraw = set()
+        still = []
+        for instance in instances:
+            if instance.destroyed or not instance.visible:
+                continue
+            old = last.pop(instance.id, None)
+            if self.queue.plain(instance):
+                if instance.sprite_index is None:
+                    if old:
+                        dirty.extend(old)
+                    continue
+                sprite = sprite_image(instance.sprite_index, instance.image_index)
+                key = (instance.x, instance.y, sprite)
+                if old is not None and keys.get(instance.id) == key:
+                    current[instance.id] = old
+                    still.append((instance, old[0]))
+                    continue
+                keys[instance.id] = key
+                rect = pygame.Rect((instance.x, instance.y), sprite.get_size()).clip(bounds)
+                current[instance.id] = [rect]
+                if old:
+                    dirty.extend(old)
+                dirty.append(rect)
+                redraw.add(instance.id)
+            elif old:
+                dirty.extend(old)
+        # Whatever is left was drawn last frame and is gone now.
+        for handle, old in last.items():
+            dirty.extend(old)
+            keys.pop(handle, None)
+
+        # Still instances touching a dirty rect are redrawn whole, so
+        # their rects become dirty too, until nothing else is touched.
+        growing = bool(dirty)
+        while growing:
+            growing = False
+            untouched = []
+            for instance, rect in still:
+                if rect.collidelist(dirty) != -1:
+                    redraw.add(instance.id)
+                    dirty.append(rect)
+                    growing = True
+                else:
+                    untouched.append((instance, rect))
+            still = untouched
+
+        background = self.background
+        for rect in dirty:
+            screen.blit(background, rect, rect)
+        # Rects of the custom draw events so far, plain instances drawn
+        # after them and under them go on top again.
+        drawn_over = []
+        for instance in instances:
+            if instance.destroyed or not instance.visible:
+                continue
+            rects = current.get(instance.id)
+            if rects is not None:
+                if instance.id in redraw:
+                    instance.event_draw()
+                elif drawn_over and rects[0].collidelist(drawn_over) != -1:
+                    instance.event_draw()
+                    dirty.append(rects[0])
+            elif self.queue.plain(instance):
+                # Stock event_draw without a sprite, nothing to draw.
+                continue
+            else:
+                self.capture = drawn = []
+                instance.event_draw()
+                self.capture = None
+                current[instance.id] = drawn
+                dirty.extend(drawn)
+                drawn_over.extend(drawn)
+        if overlay is not None:
+            self.capture = drawn = []
+            overlay()
+            self.capture = None
+            current['overlay'] = drawn
+            dirty.extend(drawn)
+        self.last = current
+        return dirty
@@ -0,0 +1,130 @@
+import struct
+
+###########
+# Replays #
+###########
+# The input every logic step saw, written to a small binary file so the
+# session can be played again step for step. A header holds the random
+# seed and the logic rate, then each step is a byte telling which parts
+# of the input changed (held keys and buttons, the mouse) or are not
+# empty (presses and releases), followed by those parts only. Every
+# CHECKPOINT steps the record also carries a hash of the game state, for
+# the replay to check it is still in step with the recording.
+
+MAGIC = b"ODRP"
+VERSION = 1
+HEADER = struct.Struct("<4sBIH")
+COUNT = struct.Struct("<B")
+CODE = struct.Struct("<I")
+MOUSE = struct.Struct("<hh")
+DIGEST = 8
+CHECKPOINT = 60
+
+# Input parts in the order they are written, bit i of the step byte.
+PARTS = ('keys', 'keys_pressed', 'keys_released',
+         'buttons', 'buttons_pressed', 'buttons_released')
+# Parts written only when they change, the others when not empty.
+HELD = ('keys', 'buttons')
+MOUSE_BIT = 1 << len(PARTS)
+DIGEST_BIT = MOUSE_BIT << 1
+
+class ReplayError(Exception):
+    pass
+
+class ReplayWriter(object):
+    def __init__(self, path, seed, logic_fps):
+        super(ReplayWriter, self).__init__()
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed, logic_fps))
+        self.steps = 0
+        self.last = {}
+        self.mouse = None
+
+    def step(self, state, digest=None):
+        # Writes the input state a logic step saw, and the state hash at
+        # checkpoints.
+        flags = 0
+        chunks = []
+        for bit, name in enumerate(PARTS):
+            values = getattr(state, name)
+            if name in HELD:
+                if values == self.last.get(name, set()):
+                    continue
+                self.last[name] = set(values)
+            elif not values:
+                continue
+            flags |= 1 << bit
+            chunks.append(COUNT.pack(len(values)))
+            chunks.extend(CODE.pack(value) for value in sorted(values))
+        if state.mouse != self.mouse:
+            self.mouse = state.mouse
+            flags |= MOUSE_BIT
+            chunks.append(MOUSE.pack(state.mouse[0], state.mouse[1]))
+        if digest is not None:
+            flags |= DIGEST_BIT
+            chunks.append(digest[:DIGEST])
+        self.file.write(COUNT.pack(flags))
+        self.file.write(b"".join(chunks))
+        self.steps += 1
+
+    def close(self):
+        self.file.close()
+
+class ReplayReader(object):
+    def __init__(self, path):
+        super(ReplayReader, self).__init__()
+        with open(path, 'rb') as replay_file:
+            data = replay_file.read()
+        if len(data) < HEADER.size:
+            raise ReplayError("%s is not a replay" % path)
+        magic, version, self.seed, self.logic_fps = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ReplayError("%s is not a version %d replay" % (path, VERSION))
+        # One (parts, mouse, digest) per step, parts in PARTS order.
+        self.steps = []
+        self.step = 0
+        held = {}
+        mouse = (0, 0)
+        offset = HEADER.size
+        try:
+            while offset < len(data):
+                flags = ord(data[offset:offset + 1])
+                offset += 1
+                parts = []
+                for bit, name in enumerate(PARTS):
+                    if flags & (1 << bit):
+                        count = ord(data[offset:offset + 1])
+                        offset += 1
+                        values = frozenset(CODE.unpack_from(data, offset + index * CODE.size)[0]
+                                           for index in range(count))
+                        offset += count * CODE.size
+                    elif name in HELD:
+                        values = held.get(name, frozenset())
+                    else:
+                        values = frozenset()
+                    if name in HELD:
+                        held[name] = values
+                    parts.append(values)
+                if flags & MOUSE_BIT:
+                    mouse = MOUSE.unpack_from(data, offset)
+                    offset += MOUSE.size
+                digest = None
+                if flags & DIGEST_BIT:
+                    digest = data[offset:offset + DIGEST]
+                    offset += DIGEST
+                self.steps.append((parts, mouse, digest))
+        except struct.error:
+            raise ReplayError("%s is cut short at step %d" % (path, len(self.steps)))
+
+    def done(self):
+        return self.step >= len(self.steps)
+
+    def apply(self, state):
+        # Sets state to the input of the next step, returns the hash the
+        # recording had after it (None if it is not a checkpoint).
+        parts, mouse, digest = self.steps[self.step]
+        for name, values in zip(PARTS, parts):
+            setattr(state, name, set(values))
+        state.mouse = mouse
+        self.step += 1
+        return digest
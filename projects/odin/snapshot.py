@@ -0,0 +1,76 @@
+import pygame
+
+#############
+# Snapshots #
+#############
+# Copies of a room's instances, to restart it without running its create
+# events again. References between instances are remapped to the copies,
+# one level deep (attributes, and lists, tuples, dicts and sets held in
+# them); other values are shared, and mask rects are copied.
+
+class Slots(object):
+    __slots__ = ('slot',)
+
+MEMBER = type(Slots.slot)
+slot_names = {}
+
+def instance_slots(cls):
+    # Slot attributes of cls that really are slots (not shadowed by a
+    # property like the mask of batched objects).
+    names = slot_names.get(cls)
+    if names is None:
+        names = []
+        for base in cls.__mro__:
+            slots = base.__dict__.get('__slots__', ())
+            if isinstance(slots, str):
+                slots = (slots,)
+            for name in slots:
+                if name not in names and isinstance(getattr(cls, name, None), MEMBER):
+                    names.append(name)
+        slot_names[cls] = names
+    return names
+
+SCALARS = frozenset((int, long, float, bool, str, unicode, type(None)))
+
+def copy_value(value, copies):
+    kind = value.__class__
+    if kind in SCALARS:
+        return value
+    copy = copies.get(id(value))
+    if copy is not None:
+        return copy
+    if kind is list:
+        return [copies.get(id(item), item) for item in value]
+    if kind is tuple:
+        return tuple([copies.get(id(item), item) for item in value])
+    if kind is dict:
+        return dict((key, copies.get(id(item), item)) for key, item in value.items())
+    if kind is set:
+        return set([copies.get(id(item), item) for item in value])
+    if kind is pygame.Rect:
+        return pygame.Rect(value)
+    return value
+
+def copy_instances(instances, batches):
+    # Copies of instances (and of the batches of the batched ones), and
+    # the id(original) -> copy map.
+    copies = {}
+    for batch, copy in batches.items():
+        copies[id(batch)] = copy
+    fresh = []
+    for instance in instances:
+        cls = instance.__class__
+        copy = cls.__new__(cls)
+        copies[id(instance)] = copy
+        fresh.append(copy)
+    for instance, copy in zip(instances, fresh):
+        for name in instance_slots(instance.__class__):
+            if hasattr(instance, name):
+                setattr(copy, name, copy_value(getattr(instance, name), copies))
+        attributes = getattr(instance, '__dict__', None)
+        if attributes:
+            copy.__dict__.update((name, copy_value(value, copies))
+                                 for name, value in attributes.items())
+    for copy in batches.values():
+        copy.instances = [copies[id(instance)] for instance in copy.instances]
+    return fresh, copies
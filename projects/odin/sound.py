@@ -0,0 +1,88 @@
+import pygame
+
+#########
+# Sound #
+#########
+# Sounds are decoded once when they are created, and played on a fixed
+# set of mixer channels made up front. When they are all busy the oldest
+# voice of the lowest priority is stolen (or the new one dropped), so
+# playing a sound never touches the disk or makes new objects.
+
+class SoundBank(object):
+    def __init__(self, channels=16):
+        super(SoundBank, self).__init__()
+        self.sounds = {}
+        self.channels = []
+        self.priorities = []
+        self.started = []
+        self.stamp = 0
+        self.next = 0
+        self.plays = 0
+        self.steals = 0
+        self.drops = 0
+        self.enabled = pygame.mixer.get_init() is not None
+        if self.enabled:
+            pygame.mixer.set_num_channels(channels)
+            for index in range(channels):
+                self.channels.append(pygame.mixer.Channel(index))
+                self.priorities.append(0)
+                self.started.append(0)
+
+    def load(self, path):
+        # Decoded sound of the file, None without a mixer.
+        if not self.enabled:
+            return None
+        sound = self.sounds.get(path)
+        if sound is None:
+            sound = self.sounds[path] = pygame.mixer.Sound(path)
+        return sound
+
+    def channel(self, priority):
+        # A free channel, or the one to steal, or -1 to drop the sound.
+        channels = self.channels
+        count = len(channels)
+        start = self.next
+        for offset in range(count):
+            index = (start + offset) % count
+            if not channels[index].get_busy():
+                self.next = (index + 1) % count
+                return index
+        victim = -1
+        for index in range(count):
+            if self.priorities[index] > priority:
+                continue
+            if (victim == -1 or self.priorities[index] < self.priorities[victim]
+                    or (self.priorities[index] == self.priorities[victim]
+                        and self.started[index] < self.started[victim])):
+                victim = index
+        if victim == -1:
+            self.drops += 1
+        else:
+            self.steals += 1
+        return victim
+
+    def play(self, sound, loops=0, priority=0, volume=1.0):
+        # Channel the sound plays on, None if it was dropped.
+        if sound is None or not self.channels:
+            return None
+        index = self.channel(priority)
+        if index == -1:
+            return None
+        channel = self.channels[index]
+        channel.play(sound, loops)
+        channel.set_volume(volume)
+        self.stamp += 1
+        self.started[index] = self.stamp
+        self.priorities[index] = priority
+        self.plays += 1
+        return channel
+
+    def stop(self):
+        for channel in self.channels:
+            channel.stop()
+
+    def stats(self):
+        busy = len([channel for channel in self.channels if channel.get_busy()])
+        return {'sounds': len(self.sounds), 'channels': len(self.channels),
+                'busy': busy, 'plays': self.plays, 'steals': self.steals,
+                'drops': self.drops}
@@ -0,0 +1,434 @@
+import pygame
+import math
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+#######################
+# Spatial hash (grid) #
+#######################
+# Instances are bucketed by the cells their mask covers, so collision
+# queries only look at the instances living around the queried rect
+# instead of every instance in the room. Buckets map instance.id to the
+# instance, so removal is O(1) and iteration order does not depend on
+# memory addresses.
+
+EMPTY = {}
+
+class SpatialHash(object):
+    # Updated one instance at a time, not by batch_step() in bulk.
+    bulk = False
+
+    def __init__(self, cell_size=32):
+        super(SpatialHash, self).__init__()
+        self.cell_size = cell_size
+        self.cells = {}
+        self.ranges = {}
+        # Cells ever used since the last clear, bounds nearest() searches.
+        self.bounds = None
+        # Farthest an instance's (x, y) was seen from its mask's top left
+        # (masks follow the bounding box of sprite frames).
+        self.reach = 0
+
+    def cell_range(self, rect):
+        size = self.cell_size
+        left = rect[0] // size
+        top = rect[1] // size
+        right = (rect[0] + max(rect[2], 1) - 1) // size
+        bottom = (rect[1] + max(rect[3], 1) - 1) // size
+        return (left, top, right, bottom)
+
+    def insert(self, instance):
+        cells = self.cells
+        mask = instance.mask
+        area = self.cell_range(mask)
+        offset = max(abs(instance.x - mask[0]), abs(instance.y - mask[1]))
+        if offset > self.reach:
+            self.reach = offset
+        self.ranges[instance] = area
+        bounds = self.bounds
+        if bounds is None:
+            self.bounds = list(area)
+        else:
+            bounds[0] = min(bounds[0], area[0])
+            bounds[1] = min(bounds[1], area[1])
+            bounds[2] = max(bounds[2], area[2])
+            bounds[3] = max(bounds[3], area[3])
+        for cx in range(area[0], area[2] + 1):
+            for cy in range(area[1], area[3] + 1):
+                key = (cx, cy)
+                bucket = cells.get(key)
+                if bucket is None:
+                    cells[key] = {instance.id: instance}
+                else:
+                    bucket[instance.id] = instance
+
+    def remove(self, instance):
+        area = self.ranges.pop(instance, None)
+        if area is None:
+            return
+        cells = self.cells
+        for cx in range(area[0], area[2] + 1):
+            for cy in range(area[1], area[3] + 1):
+                key = (cx, cy)
+                bucket = cells[key]
+                del bucket[instance.id]
+                if not bucket:
+                    del cells[key]
+
+    def update(self, instance):
+        # Only touch the buckets when the mask moved into other cells.
+        # Instances it does not hold (dropped with their room) stay out.
+        area = self.ranges.get(instance)
+        if area is None:
+            return
+        mask = instance.mask
+        if area != self.cell_range(mask):
+            self.remove(instance)
+            self.insert(instance)
+            return
+        offset = max(abs(instance.x - mask[0]), abs(instance.y - mask[1]))
+        if offset > self.reach:
+            self.reach = offset
+
+    def move(self, instances, lefts, tops, rights, bottoms):
+        # Files instances again under the given cell ranges in one pass,
+        # for batches that computed them in bulk (no masks are built).
+        if not instances:
+            return
+        cells = self.cells
+        ranges = self.ranges
+        # Batched masks start at the truncated position.
+        if self.reach < 1:
+            self.reach = 1
+        bounds = self.bounds
+        if bounds is not None:
+            bounds[0] = min(bounds[0], min(lefts))
+            bounds[1] = min(bounds[1], min(tops))
+            bounds[2] = max(bounds[2], max(rights))
+            bounds[3] = max(bounds[3], max(bottoms))
+        for instance, left, top, right, bottom in zip(instances, lefts, tops, rights, bottoms):
+            old = ranges.get(instance)
+            if old is None:
+                continue
+            handle = instance.id
+            if old[0] == old[2] and old[1] == old[3]:
+                key = (old[0], old[1])
+                bucket = cells[key]
+                del bucket[handle]
+                if not bucket:
+                    del cells[key]
+            else:
+                for cx in range(old[0], old[2] + 1):
+                    for cy in range(old[1], old[3] + 1):
+                        key = (cx, cy)
+                        bucket = cells[key]
+                        del bucket[handle]
+                        if not bucket:
+                            del cells[key]
+            ranges[instance] = (left, top, right, bottom)
+            for cx in range(left, right + 1):
+                for cy in range(top, bottom + 1):
+                    key = (cx, cy)
+                    bucket = cells.get(key)
+                    if bucket is None:
+                        cells[key] = {handle: instance}
+                    else:
+                        bucket[handle] = instance
+
+    def clear(self):
+        self.cells.clear()
+        self.ranges.clear()
+        self.bounds = None
+        self.reach = 0
+
+    def nearby(self, rect):
+        # Instances sharing a cell with rect, without the overlap test.
+        cells = self.cells
+        area = self.cell_range(rect)
+        if area[0] == area[2] and area[1] == area[3]:
+            return list(cells.get((area[0], area[1]), EMPTY).values())
+        found = []
+        seen = set()
+        for cx in range(area[0], area[2] + 1):
+            for cy in range(area[1], area[3] + 1):
+                for key, instance in cells.get((cx, cy), EMPTY).items():
+                    if key not in seen:
+                        seen.add(key)
+                        found.append(instance)
+        return found
+
+    def query(self, rect, obj=None, notme=None):
+        # Instances whose mask overlaps rect, optionally filtered by class.
+        if not isinstance(rect, pygame.Rect):
+            rect = pygame.Rect(rect)
+        found = []
+        for instance in self.nearby(rect):
+            if instance is notme:
+                continue
+            if obj is not None and not isinstance(instance, obj):
+                continue
+            if rect.colliderect(instance.mask):
+                found.append(instance)
+        return found
+
+    def position(self, x, y, obj=None, notme=None):
+        # First instance whose mask contains the point, or None.
+        size = self.cell_size
+        for instance in self.cells.get((x // size, y // size), EMPTY).values():
+            if instance is notme:
+                continue
+            if obj is not None and not isinstance(instance, obj):
+                continue
+            if instance.mask.collidepoint(x, y):
+                return instance
+        return None
+
+    def nearest(self, x, y, notme=None):
+        # Walks rings of cells around (x,y) until no closer instance can
+        # be left, returns (distance, instance). Distances are to the
+        # instances' (x, y), up to reach away from the cells they are in.
+        if not self.ranges:
+            return (None, None)
+        size = self.cell_size
+        cx = int(x // size)
+        cy = int(y // size)
+        cells = self.cells
+        bounds = self.bounds
+        limit = max(abs(cx - bounds[0]), abs(cx - bounds[2]),
+                    abs(cy - bounds[1]), abs(cy - bounds[3]))
+        best = None
+        best_distance = None
+        radius = 0
+        while radius <= limit:
+            if best is not None and (radius - 1) * size - self.reach >= best_distance:
+                break
+            for key in ring(cx, cy, radius):
+                for instance in cells.get(key, EMPTY).values():
+                    if instance is notme:
+                        continue
+                    distance = math.sqrt((instance.x - x)**2 + (instance.y - y)**2)
+                    if best is None or distance < best_distance:
+                        best = instance
+                        best_distance = distance
+            radius += 1
+        return (best_distance, best)
+
+
+def ring(cx, cy, radius):
+    # Cells at exactly `radius` (chessboard distance) from (cx, cy).
+    if radius == 0:
+        return [(cx, cy)]
+    keys = []
+    for dx in range(-radius, radius + 1):
+        keys.append((cx + dx, cy - radius))
+        keys.append((cx + dx, cy + radius))
+    for dy in range(-radius + 1, radius):
+        keys.append((cx - radius, cy + dy))
+        keys.append((cx + radius, cy + dy))
+    return keys
+
+
+# Cell (column, row) packed in one int64 key, rows then columns, for cells
+# within 2**20 of the origin either way.
+KEY_OFFSET = 2**20
+KEY_WIDTH = 2**21
+
+class BatchGrid(object):
+    # Grid of a simple batched class (see BatchMeta), whose rows all move
+    # every step: instead of moving instances between buckets one by one,
+    # the rows are sorted by the cell of their mask's top left with NumPy,
+    # only when the class is queried after a step. Queries take the rows
+    # of the cells around the rect (widened by the biggest mask), rows
+    # added since are checked too, and dead rows are left out.
+    bulk = True
+
+    def __init__(self, cell_size=32):
+        super(BatchGrid, self).__init__()
+        self.cell_size = cell_size
+        self.clear()
+
+    def clear(self):
+        self.batch = None
+        # Sorted cell keys and their rows, None when they must be built.
+        self.keys = None
+        self.rows = None
+        self.built = 0
+        self.version = None
+        self.span = (0, 0)
+
+    def insert(self, instance):
+        # The row is already in the batch, checked until the next build.
+        self.batch = instance.batch
+
+    def remove(self, instance):
+        pass
+
+    def update(self, instance):
+        self.keys = None
+
+    def invalidate(self):
+        self.keys = None
+
+    def build(self):
+        batch = self.batch
+        n = batch.count
+        size = self.cell_size
+        left = numpy.trunc(batch.x[:n]).astype(numpy.int64) // size
+        top = numpy.trunc(batch.y[:n]).astype(numpy.int64) // size
+        keys = (top + KEY_OFFSET) * KEY_WIDTH + (left + KEY_OFFSET)
+        rows = numpy.argsort(keys, kind='mergesort')
+        self.keys = keys[rows]
+        self.rows = rows
+        self.built = n
+        self.version = batch.version
+        if n:
+            # A mask starting anywhere in a cell reaches this many cells on.
+            self.span = (int(numpy.maximum(batch.mask_width[:n], 1).max() + size - 2) // size,
+                         int(numpy.maximum(batch.mask_height[:n], 1).max() + size - 2) // size)
+
+    def candidates(self, rect):
+        # Rows that may overlap rect.
+        batch = self.batch
+        if batch is None or batch.count == 0:
+            return None
+        if self.keys is None or self.version != batch.version or self.built > batch.count:
+            self.build()
+        size = self.cell_size
+        span_x, span_y = self.span
+        left = rect[0] // size - span_x
+        right = (rect[0] + max(rect[2], 1) - 1) // size
+        keys = self.keys
+        pieces = []
+        for row in range(rect[1] // size - span_y, (rect[1] + max(rect[3], 1) - 1) // size + 1):
+            base = (row + KEY_OFFSET) * KEY_WIDTH + KEY_OFFSET
+            start = numpy.searchsorted(keys, base + left, 'left')
+            end = numpy.searchsorted(keys, base + right, 'right')
+            if start < end:
+                pieces.append(self.rows[start:end])
+        if batch.count > self.built:
+            pieces.append(numpy.arange(self.built, batch.count))
+        if not pieces:
+            return None
+        return numpy.sort(numpy.concatenate(pieces))
+
+    def query(self, rect, obj=None, notme=None):
+        rows = self.candidates(rect)
+        if rows is None:
+            return []
+        batch = self.batch
+        left = numpy.trunc(batch.x[rows]).astype(numpy.int64)
+        top = numpy.trunc(batch.y[rows]).astype(numpy.int64)
+        width = batch.mask_width[rows]
+        height = batch.mask_height[rows]
+        # Same test as Rect.colliderect, empty rects touch nothing.
+        if rect[2] == 0 or rect[3] == 0:
+            return []
+        x = min(rect[0], rect[0] + rect[2])
+        y = min(rect[1], rect[1] + rect[3])
+        right = max(rect[0], rect[0] + rect[2])
+        bottom = max(rect[1], rect[1] + rect[3])
+        hit = (batch.alive[rows] & (width != 0) & (height != 0)
+               & (left < right) & (left + width > x) & (top < bottom) & (top + height > y))
+        instances = batch.instances
+        found = [instances[index] for index in rows[hit].tolist()]
+        if notme is not None or obj is not None:
+            found = [instance for instance in found if instance is not notme
+                     and (obj is None or isinstance(instance, obj))]
+        return found
+
+    def position(self, x, y, obj=None, notme=None):
+        found = self.query((x, y, 1, 1), obj, notme)
+        if found:
+            return found[0]
+        return None
+
+    def nearest(self, x, y, notme=None):
+        # Every live row is measured, one array operation.
+        batch = self.batch
+        if batch is None or batch.count == 0:
+            return (None, None)
+        n = batch.count
+        distance = numpy.sqrt((batch.x[:n] - x)**2 + (batch.y[:n] - y)**2)
+        distance[~batch.alive[:n]] = numpy.inf
+        if notme is not None and getattr(notme, 'batch', None) is batch:
+            distance[notme.index] = numpy.inf
+        index = int(numpy.argmin(distance))
+        if distance[index] == numpy.inf:
+            return (None, None)
+        return (float(distance[index]), batch.instances[index])
+
+
+class SpatialIndex(object):
+    # One SpatialHash per class, so asking for a class only walks the
+    # grids of that class and its children.
+    def __init__(self, cell_size=32):
+        super(SpatialIndex, self).__init__()
+        self.cell_size = cell_size
+        self.grids = {}
+        self.classes = []
+        self.lookup = {}
+
+    def grid(self, cls):
+        grid = self.grids.get(cls)
+        if grid is None:
+            if cls.batched and cls.simple:
+                grid = BatchGrid(self.cell_size)
+            else:
+                grid = SpatialHash(self.cell_size)
+            self.grids[cls] = grid
+            self.classes.append(cls)
+            self.lookup.clear()
+        return grid
+
+    def grids_for(self, obj=None):
+        grids = self.lookup.get(obj)
+        if grids is None:
+            grids = [self.grids[cls] for cls in self.classes
+                     if obj is None or issubclass(cls, obj)]
+            self.lookup[obj] = grids
+        return grids
+
+    def insert(self, instance):
+        self.grid(instance.__class__).insert(instance)
+
+    def remove(self, instance):
+        grid = self.grids.get(instance.__class__)
+        if grid is not None:
+            grid.remove(instance)
+
+    def update(self, instance):
+        self.grid(instance.__class__).update(instance)
+
+    def clear(self):
+        for grid in self.grids.values():
+            grid.clear()
+
+    def query(self, rect, obj=None, notme=None, bulk=True):
+        # bulk=False leaves out the simple batched classes, which are
+        # neither stepped nor drawn one instance at a time.
+        if not isinstance(rect, pygame.Rect):
+            rect = pygame.Rect(rect)
+        found = []
+        for grid in self.grids_for(obj):
+            if bulk or not grid.bulk:
+                found.extend(grid.query(rect, None, notme))
+        return found
+
+    def position(self, x, y, obj=None, notme=None):
+        for grid in self.grids_for(obj):
+            instance = grid.position(x, y, None, notme)
+            if instance is not None:
+                return instance
+        return None
+
+    def nearest(self, x, y, obj=None, notme=None):
+        best = None
+        best_distance = None
+        for grid in self.grids_for(obj):
+            distance, instance = grid.nearest(x, y, notme)
+            if instance is not None and (best is None or distance < best_distance):
+                best = instance
+                best_distance = distance
+        return best
@@ -0,0 +1,80 @@
+import pygame
+
+###########
+# Sprites #
+###########
+# A sprite is a horizontal strip of equally wide frames, cut into
+# subsurfaces once when it is loaded. Every frame keeps its bounding box
+# (the non transparent part, relative to the frame) and, for precise
+# collisions, a pygame.mask.Mask, so nothing is recomputed per step.
+# Sprites are also Surfaces: a sprite is its first frame, so code that
+# blits it or asks for its size or rect sees one frame. The sprite and its
+# frames are subsurfaces of one sheet holding the strip, the atlas page it
+# comes from or a copy of the loaded image, so no pixels are held twice.
+
+class Sprite(pygame.Surface):
+    def __new__(cls, surface, frames=1, precise=False):
+        # Subsurfaces of a Sprite are Sprites, so the sheet must be one.
+        if surface.__class__ is not Sprite:
+            surface = sprite_sheet(surface)
+        width = surface.get_width() // max(int(frames), 1)
+        return surface.subsurface(pygame.Rect(0, 0, width, surface.get_height()))
+
+    def __init__(self, surface, frames=1, precise=False):
+        # No Surface.__init__, __new__ cut the pixels out of the sheet.
+        sheet = self.get_parent()
+        self.count = max(int(frames), 1)
+        self.width, self.height = self.get_size()
+        self.frames = []
+        self.boxes = []
+        for index in range(self.count):
+            frame = sheet.subsurface(pygame.Rect(index * self.width, 0, self.width, self.height))
+            self.frames.append(frame)
+            box = frame.get_bounding_rect()
+            if box.width == 0 or box.height == 0:
+                box = frame.get_rect()
+            self.boxes.append(box)
+        self.masks = [None] * self.count
+        if precise:
+            for index in range(self.count):
+                self.mask(index)
+
+    def frame(self, index):
+        return self.frames[int(index) % self.count]
+
+    def box(self, index):
+        return self.boxes[int(index) % self.count]
+
+    def mask(self, index):
+        # Pixel mask of a frame, built the first time it is asked for.
+        index = int(index) % self.count
+        mask = self.masks[index]
+        if mask is None:
+            mask = self.masks[index] = pygame.mask.from_surface(self.frames[index])
+        return mask
+
+
+def sprite_sheet(surface):
+    # Sprite typed copy of surface (pixels, colorkey and alpha), for
+    # sprites to be cut out of. Only the sprites cut out of it are set up.
+    flags = pygame.SRCALPHA if surface.get_masks()[3] else 0
+    sheet = pygame.Surface.__new__(Sprite)
+    pygame.Surface.__init__(sheet, surface.get_size(), flags, surface)
+    colorkey = surface.get_colorkey()
+    alpha = surface.get_alpha()
+    surface.set_colorkey(None)
+    surface.set_alpha(None)
+    sheet.blit(surface, (0, 0))
+    surface.set_colorkey(colorkey)
+    surface.set_alpha(alpha)
+    if colorkey is not None:
+        sheet.set_colorkey(colorkey)
+    if alpha is not None:
+        sheet.set_alpha(alpha)
+    return sheet
+
+def sprite_image(sprite, index=0):
+    # Surface to blit for a sprite frame, plain surfaces are used as is.
+    if sprite.__class__ is Sprite:
+        return sprite.frames[int(index) % sprite.count]
+    return sprite
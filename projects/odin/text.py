@@ -0,0 +1,80 @@
+import pygame
+from collections import OrderedDict
+
+##############
+# Text cache #
+##############
+# Rendered strings are kept in a bounded LRU cache, so HUD text that does
+# not change is not rasterized again every frame. Strings made only of
+# GLYPHS (scores, timers) are blitted glyph by glyph from surfaces
+# rendered once, so a number that changes never goes through the font
+# renderer and does not churn the cache.
+
+GLYPHS = "0123456789 .,:-+/%"
+GLYPH_SET = frozenset(GLYPHS)
+
+class TextCache(object):
+    def __init__(self, size=256):
+        super(TextCache, self).__init__()
+        self.size = size
+        self.surfaces = OrderedDict()
+        self.glyphs = {}
+        self.hits = 0
+        self.misses = 0
+        self.glyph_draws = 0
+
+    def render(self, font, string, color, antialias=True):
+        key = (font, string, tuple(color), antialias)
+        surfaces = self.surfaces
+        surface = surfaces.pop(key, None)
+        if surface is None:
+            self.misses += 1
+            surface = font.render(string, antialias, color)
+            if len(surfaces) >= self.size:
+                surfaces.popitem(last=False)
+        else:
+            self.hits += 1
+        surfaces[key] = surface
+        return surface
+
+    def glyph_set(self, font, color, antialias=True):
+        # character -> (surface, advance) for one font and color.
+        key = (font, tuple(color), antialias)
+        glyphs = self.glyphs.get(key)
+        if glyphs is None:
+            glyphs = self.glyphs[key] = {}
+            for char, metrics in zip(GLYPHS, font.metrics(GLYPHS)):
+                surface = font.render(char, antialias, color)
+                advance = metrics[4] if metrics else surface.get_width()
+                glyphs[char] = (surface, advance)
+        return glyphs
+
+    def draw(self, target, font, string, color, x, y, antialias=True):
+        # Blits string at (x, y) and returns the rect it covers.
+        if not string or not GLYPH_SET.issuperset(string):
+            return target.blit(self.render(font, string, color, antialias), (x, y))
+        self.glyph_draws += 1
+        glyphs = self.glyph_set(font, color, antialias)
+        sequence = []
+        left = x
+        for char in string:
+            glyph, advance = glyphs[char]
+            sequence.append((glyph, (x, y)))
+            x += advance
+        if hasattr(target, 'blits'):
+            target.blits(sequence, False)
+        else:
+            for glyph, position in sequence:
+                target.blit(glyph, position)
+        return pygame.Rect(left, y, x - left, font.get_height()).clip(target.get_clip())
+
+    def clear(self):
+        self.surfaces.clear()
+        self.glyphs.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses,
+                'size': len(self.surfaces), 'capacity': self.size,
+                'glyph_draws': self.glyph_draws,
+                'hit_rate': float(self.hits) / total if total else 0.0}
@@ -0,0 +1,84 @@
+import pygame
+from sprite import sprite_image
+
+##############
+# Tile layer #
+##############
+# A level grid turned into one pre-rendered surface plus a grid of the
+# object classes the tiles stand for, so static walls are never stepped
+# or drawn one by one and "is there a wall here" is a table lookup.
+
+class TileLayer(object):
+    def __init__(self, level, tiles, tile_size=32, x=0, y=0):
+        super(TileLayer, self).__init__()
+        self.tile_size = tile_size
+        self.x = x
+        self.y = y
+        self.rows = len(level)
+        self.columns = max([len(row) for row in level] or [0])
+        self.grid = []
+        for row in level:
+            cells = [tiles.get(char) for char in row]
+            cells.extend([None] * (self.columns - len(cells)))
+            self.grid.append(cells)
+        self.surface = self.render()
+
+    def render(self):
+        size = self.tile_size
+        surface = pygame.Surface((self.columns * size, self.rows * size), pygame.SRCALPHA)
+        for row, cells in enumerate(self.grid):
+            for column, obj in enumerate(cells):
+                if obj is not None and obj.sprite_index is not None:
+                    surface.blit(sprite_image(obj.sprite_index), (column * size, row * size))
+        return surface.convert_alpha()
+
+    def tile(self, x, y):
+        # Object class of the tile under the point, or None.
+        size = self.tile_size
+        column = int((x - self.x) // size)
+        row = int((y - self.y) // size)
+        if 0 <= row < self.rows and 0 <= column < self.columns:
+            return self.grid[row][column]
+        return None
+
+    def cells(self, rect):
+        # Grid rows and columns overlapped by rect, as two ranges.
+        size = self.tile_size
+        left = max(int((rect[0] - self.x) // size), 0)
+        top = max(int((rect[1] - self.y) // size), 0)
+        right = min(int((rect[0] + rect[2] - 1 - self.x) // size), self.columns - 1)
+        bottom = min(int((rect[1] + rect[3] - 1 - self.y) // size), self.rows - 1)
+        return range(top, bottom + 1), range(left, right + 1)
+
+    def meeting(self, rect, obj=None):
+        # Whether any tile (of class obj) overlaps rect, empty rects
+        # overlap nothing (like pygame.Rect.colliderect).
+        if rect[2] <= 0 or rect[3] <= 0:
+            return False
+        rows, columns = self.cells(rect)
+        for row in rows:
+            cells = self.grid[row]
+            for column in columns:
+                tile = cells[column]
+                if tile is not None and (obj is None or issubclass(tile, obj)):
+                    return True
+        return False
+
+    def tiles_in(self, rect, obj=None):
+        # (class, x, y) of the tiles (of class obj) overlapping rect.
+        found = []
+        if rect[2] <= 0 or rect[3] <= 0:
+            return found
+        size = self.tile_size
+        rows, columns = self.cells(rect)
+        for row in rows:
+            cells = self.grid[row]
+            for column in columns:
+                tile = cells[column]
+                if tile is not None and (obj is None or issubclass(tile, obj)):
+                    found.append((tile, self.x + column * size, self.y + row * size))
+        return found
+
+    def draw(self, surface, origin=(0, 0)):
+        # origin is the world position of the top left of surface.
+        surface.blit(self.surface, (self.x - origin[0], self.y - origin[1]))
@@ -0,0 +1,55 @@
+import pygame
+
+#########
+# Views #
+#########
+# A camera over a room bigger than the screen. It follows an instance,
+# keeping it at least hborder/vborder pixels from the edges, stays inside
+# the room, and gives the world rect to draw (and optionally to step), so
+# the spatial index can pick the instances in it.
+
+class View(object):
+    def __init__(self, width, height, x=0, y=0):
+        super(View, self).__init__()
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.follow = None
+        self.hborder = width // 2
+        self.vborder = height // 2
+        # Extra pixels drawn around the view, for sprites wider than their
+        # mask (or drawn between steps).
+        self.margin = 32
+        # Pixels around the view where instances still step, None steps
+        # every instance.
+        self.activation = None
+
+    def update(self, room_width=0, room_height=0):
+        target = self.follow
+        if target is not None and not target.destroyed:
+            if target.x - self.x < self.hborder:
+                self.x = target.x - self.hborder
+            elif self.x + self.width - target.x < self.hborder:
+                self.x = target.x + self.hborder - self.width
+            if target.y - self.y < self.vborder:
+                self.y = target.y - self.vborder
+            elif self.y + self.height - target.y < self.vborder:
+                self.y = target.y + self.vborder - self.height
+        if room_width > self.width:
+            self.x = min(max(self.x, 0), room_width - self.width)
+        if room_height > self.height:
+            self.y = min(max(self.y, 0), room_height - self.height)
+        self.x = int(self.x)
+        self.y = int(self.y)
+
+    def rect(self, margin=0):
+        # The world rect seen, grown by margin on every side.
+        return pygame.Rect(self.x - margin, self.y - margin,
+                           self.width + margin * 2, self.height + margin * 2)
+
+    def to_screen(self, x, y):
+        return (x - self.x, y - self.y)
+
+    def to_world(self, x, y):
+        return (x + self.x, y + self.y)